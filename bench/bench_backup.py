@@ -0,0 +1,80 @@
+# bench/bench_backup.py
+"""
+Benchmark: online copy, full and incremental snapshots, and restore.
+
+Builds a throwaway database of ROWS payments, then times each backup path
+and reports throughput in MB/s of source database.
+
+    python -m bench.bench_backup [ROWS]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert
+
+from models import Base
+from models.property import Property
+from models.tenant import Tenant
+from models.lease import Lease
+from models.payment import Payment
+from db.backup import online_copy, restore, snapshot
+
+
+def _build(path: str, rows: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Property.__table__), [
+            {"address": f"{i} Bench Road", "monthly_rent": 1000, "is_available": True} for i in range(1000)
+        ])
+        conn.execute(insert(Tenant.__table__), [
+            {"name": f"Tenant {i}", "contact_info": f"07{i:08d}"} for i in range(1000)
+        ])
+        conn.execute(insert(Lease.__table__), [
+            {"property_id": i + 1, "tenant_id": i + 1, "start_date": date(2020, 1, 1), "status": "active"}
+            for i in range(1000)
+        ])
+        conn.execute(insert(Payment.__table__), [
+            {"lease_id": i % 1000 + 1, "amount": 1000, "date_paid": date(2020, 1, 1) + timedelta(days=i % 1800),
+             "method": "mpesa"}
+            for i in range(rows)
+        ])
+    engine.dispose()
+
+
+def _timed(label: str, size: int, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:7.3f}s  {size / elapsed / 1e6:8.1f} MB/s")
+    return result
+
+
+def main(rows: int = 500_000) -> None:
+    tmp = tempfile.mkdtemp()
+    db = os.path.join(tmp, "bench.db")
+    backups = os.path.join(tmp, "backups")
+    _build(db, rows)
+    size = os.path.getsize(db)
+    print(f"source: {size / 1e6:.1f} MB ({rows} payments)")
+
+    _timed("online_copy", size, lambda: online_copy(db, os.path.join(tmp, "copy.db"), pages=1024, sleep=0))
+    full = _timed("full snapshot", size, lambda: snapshot(db, backups, sleep=0))
+
+    conn = sqlite3.connect(db)
+    conn.execute("UPDATE payments SET method = 'bank' WHERE id % 997 = 0")
+    conn.commit()
+    conn.close()
+    incr = _timed("incremental snapshot", size, lambda: snapshot(db, backups, sleep=0))
+    _timed("restore (full + incr)", size, lambda: restore(backups, os.path.join(tmp, "restored.db")))
+
+    print(f"full: {full['bytes'] / 1e6:.1f} MB stored, "
+          f"incremental: {incr['pages_written']}/{incr['page_count']} pages, {incr['bytes'] / 1e6:.2f} MB stored")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
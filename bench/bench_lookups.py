@@ -0,0 +1,61 @@
+# bench/bench_lookups.py
+"""
+Micro-benchmark: per-call overhead of the CRUDMixin lookup paths.
+
+Compares the legacy Query API (rebuilt on every call) with the cached
+select() statements now used by CRUDMixin, on a throwaway in-memory DB.
+
+    python -m bench.bench_lookups [N]
+"""
+import sys
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, import_all
+from models.property import Property
+
+import_all()
+
+
+def _timed(label: str, n: int, fn) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.3f}s  {elapsed / n * 1e6:8.2f} us/call")
+    return elapsed
+
+
+def main(n: int = 100_000) -> None:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    rows = 500
+    for i in range(rows):
+        Property.create(session, address=f"{i} Bench Road", monthly_rent=1000 + i)
+    session.expire_on_commit = False
+
+    def legacy_by_id(i):
+        return session.query(Property).filter(Property._id_col == i % rows + 1).first()
+
+    def cached_by_id(i):
+        return Property.find_by_id(session, i % rows + 1)
+
+    def legacy_by_attr(i):
+        return session.query(Property).filter_by(_monthly_rent_col=1000 + i % rows).all()
+
+    def cached_by_attr(i):
+        return Property.find_by_attribute(session, monthly_rent=1000 + i % rows)
+
+    print(f"{n} lookups over {rows} rows")
+    a = _timed("find_by_id (legacy Query)", n, legacy_by_id)
+    b = _timed("find_by_id (Session.get)", n, cached_by_id)
+    c = _timed("find_by_attribute (legacy Query)", n, legacy_by_attr)
+    d = _timed("find_by_attribute (cached select)", n, cached_by_attr)
+    print(f"speedup: find_by_id x{a / b:.1f}, find_by_attribute x{c / d:.1f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
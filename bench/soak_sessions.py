@@ -0,0 +1,77 @@
+# bench/soak_sessions.py
+"""
+Soak test: memory over many CLI-style actions through SessionManager.
+
+Runs ACTIONS simulated menu actions (list, lookup, view leases and
+payments) against a throwaway database and prints traced memory and
+identity-map size every 1000 actions; the numbers should stay flat.
+
+    python -m bench.soak_sessions [ACTIONS] [ACTIONS_PER_SESSION]
+"""
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from datetime import date
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base
+from models.property import Property
+from models.tenant import Tenant
+from models.lease import Lease
+from models.payment import Payment
+import db.cdc  # noqa: F401
+from db.lifecycle import SessionManager
+
+
+def _seed(factory, n: int = 200) -> None:
+    with factory() as session:
+        for i in range(n):
+            lease = Lease(
+                property=Property(address=f"{i} Soak Street", monthly_rent=1000 + i),
+                tenant=Tenant(name=f"Tenant {i}", contact_info=f"07{i:08d}"),
+                lease_start=date(2024, 1, 1),
+            )
+            lease.payments = [
+                Payment(amount=1000, date_paid=date(2024, m, 5), method="mpesa")
+                for m in range(1, 13)
+            ]
+            session.add(lease)
+        session.commit()
+
+
+def main(actions: int = 10_000, per_session: int = 1) -> None:
+    path = os.path.join(tempfile.mkdtemp(), "soak.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    _seed(factory)
+
+    sessions = SessionManager(factory, actions_per_session=per_session)
+    tracemalloc.start()
+    for i in range(actions):
+        with sessions.action() as session:
+            kind = i % 3
+            if kind == 0:
+                Property.get_all(session)
+            elif kind == 1:
+                lease = Lease.find_by_id(session, i % 200 + 1)
+                list(lease.payments)
+            else:
+                prop = Property.find_by_id(session, i % 200 + 1)
+                list(prop.leases)
+        if (i + 1) % 1000 == 0:
+            gc.collect()
+            stats = sessions.stats()
+            print(f"{i + 1:>6} actions  traced={stats['traced_memory_bytes'] / 1024:8.0f} KiB  "
+                  f"identity_map={stats['identity_map_size']:>5}  peak={stats['peak_identity_map']}")
+    print(sessions.stats())
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    main(*args)
@@ -4,7 +4,7 @@ from models.lease import Lease
 from models.property import Property
 from models.tenant import Tenant
 from models.payment import Payment
-from utils import input_int, input_str, pause
+from utils import input_int, input_str, pause, report_error
 
 def parse_date(prompt: str) -> date:
     while True:
@@ -15,12 +15,12 @@ def parse_date(prompt: str) -> date:
             print("Invalid date format. Use YYYY-MM-DD.")
 
 def list_leases(session):
-    leases = Lease.get_all(session)
-    if not leases:
+    found = False
+    for l in Lease.iter_all(session):
+        print(l)
+        found = True
+    if not found:
         print("No leases found.")
-    else:
-        for l in leases:
-            print(l)
     pause()
 
 def create_lease(session):
@@ -41,12 +41,11 @@ def create_lease(session):
             pause()
             return
 
-        lease = Lease.create(session, property_id=pid, tenant_id=tid, start_date=start, status=status)
+        lease = Lease.create(session, property_id=pid, tenant_id=tid, lease_start=start, status=status)
         print(f"Created {lease}")
     except Exception as e:
         session.rollback()
-        import traceback; traceback.print_exc()
-        print(f"Error: {e}")
+        report_error(e)
     pause()
 
 def end_lease(session):
@@ -66,8 +65,7 @@ def end_lease(session):
         print("Lease ended.")
     except Exception as e:
         session.rollback()
-        import traceback; traceback.print_exc()
-        print(f"Error: {e}")
+        report_error(e)
     pause()
 
 def delete_lease(session):
@@ -83,8 +81,12 @@ def delete_lease(session):
                 print("Cancelled.")
                 pause()
                 return
-        lease.delete(session)
-        print("Deleted.")
+        try:
+            lease.delete(session)
+            print("Deleted.")
+        except Exception as e:
+            session.rollback()
+            report_error(e)
     pause()
 
 def find_lease_by_attribute(session):
@@ -136,8 +138,7 @@ def create_payment(session):
         print(f"Created {pay}")
     except Exception as e:
         session.rollback()
-        import traceback; traceback.print_exc()
-        print(f"Error: {e}")
+        report_error(e)
     pause()
 
 def delete_payment(session):
@@ -146,8 +147,12 @@ def delete_payment(session):
     if not pay:
         print("Payment not found.")
     else:
-        pay.delete(session)
-        print("Deleted.")
+        try:
+            pay.delete(session)
+            print("Deleted.")
+        except Exception as e:
+            session.rollback()
+            report_error(e)
     pause()
 
 def find_payment_by_attribute(session):
@@ -162,7 +167,7 @@ def find_payment_by_attribute(session):
             print(r)
     pause()
 
-def lease_menu(session):
+def lease_menu(sessions):
     actions = {
         "1": ("List all leases", list_leases),
         "2": ("Create lease", create_lease),
@@ -186,4 +191,5 @@ def lease_menu(session):
         if not action:
             print("Invalid choice.")
             continue
-        action[1](session)
+        with sessions.action() as session:
+            action[1](session)
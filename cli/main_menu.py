@@ -4,7 +4,7 @@ from cli.tenant_menu import tenant_menu
 from cli.lease_menu import lease_menu
 from utils import pause  # to give user time to read errors
 
-def main_menu(session):
+def main_menu(sessions):
     actions = {
         "1": ("Properties", property_menu),
         "2": ("Tenants", tenant_menu),
@@ -36,7 +36,7 @@ def main_menu(session):
             continue
 
         try:
-            action[1](session)
+            action[1](sessions)
         except Exception as e:
             import traceback
             print(f"\n❌ An error occurred while running '{action[0]}': {e}")
@@ -1,15 +1,14 @@
 # cli/property_menu.py
 from models.property import Property
-from utils import input_int, input_str, pause
-import traceback
+from utils import input_int, input_str, pause, report_error
 
 def list_properties(session):
-    props = Property.get_all(session)
-    if not props:
+    found = False
+    for p in Property.iter_all(session):
+        print(p)
+        found = True
+    if not found:
         print("No properties found.")
-    else:
-        for p in props:
-            print(p)
     pause()
 
 def create_property(session):
@@ -30,8 +29,7 @@ def create_property(session):
         print(f"✅ Created {prop}")
     except Exception as e:
         session.rollback()
-        print("❌ Error creating property.")
-        traceback.print_exc()
+        report_error(e, "❌ Error creating property.")
     pause()
 
 def delete_property(session):
@@ -52,8 +50,7 @@ def delete_property(session):
             print("✅ Deleted.")
     except Exception as e:
         session.rollback()
-        print("❌ Error deleting property.")
-        traceback.print_exc()
+        report_error(e, "❌ Error deleting property.")
     pause()
 
 def view_property_leases(session):
@@ -84,7 +81,7 @@ def find_property_by_attribute(session):
             print(r)
     pause()
 
-def property_menu(session):
+def property_menu(sessions):
     actions = {
         "1": ("List all properties", list_properties),
         "2": ("Create property", create_property),
@@ -108,8 +105,8 @@ def property_menu(session):
             continue
 
         try:
-            action[1](session)
+            with sessions.action() as session:
+                action[1](session)
         except Exception as e:
-            print(f"❌ Error running '{action[0]}' action.")
-            traceback.print_exc()
+            report_error(e, f"❌ Error running '{action[0]}' action.")
             pause()
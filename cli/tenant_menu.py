@@ -1,15 +1,14 @@
 # cli/tenant_menu.py
 from models.tenant import Tenant
-from utils import input_int, input_str, pause
-import traceback
+from utils import input_int, input_str, pause, report_error
 
 def list_tenants(session):
-    tenants = Tenant.get_all(session)
-    if not tenants:
+    found = False
+    for t in Tenant.iter_all(session):
+        print(t)
+        found = True
+    if not found:
         print("No tenants found.")
-    else:
-        for t in tenants:
-            print(t)
     pause()
 
 def create_tenant(session):
@@ -20,8 +19,7 @@ def create_tenant(session):
         print(f"✅ Created {t}")
     except Exception as e:
         session.rollback()
-        print("❌ Error creating tenant.")
-        traceback.print_exc()
+        report_error(e, "❌ Error creating tenant.")
     pause()
 
 def delete_tenant(session):
@@ -42,8 +40,7 @@ def delete_tenant(session):
             print("✅ Deleted.")
     except Exception as e:
         session.rollback()
-        print("❌ Error deleting tenant.")
-        traceback.print_exc()
+        report_error(e, "❌ Error deleting tenant.")
     pause()
 
 def view_tenant_leases(session):
@@ -71,7 +68,7 @@ def find_tenant_by_attribute(session):
             print(r)
     pause()
 
-def tenant_menu(session):
+def tenant_menu(sessions):
     actions = {
         "1": ("List all tenants", list_tenants),
         "2": ("Create tenant", create_tenant),
@@ -96,8 +93,8 @@ def tenant_menu(session):
             continue
 
         try:
-            action[1](session)
+            with sessions.action() as session:
+                action[1](session)
         except Exception as e:
-            print(f"❌ Error running '{action[0]}' action.")
-            traceback.print_exc()
+            report_error(e, f"❌ Error running '{action[0]}' action.")
             pause()
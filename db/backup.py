@@ -0,0 +1,303 @@
+# db/backup.py
+"""
+Online backups and point-in-time snapshots of the SQLite store.
+
+`online_copy` uses SQLite's online backup API a few pages per step, so the
+CLI keeps writing while a backup runs. `snapshot` takes such a copy and
+stores it as a compressed, checksummed snapshot file: the first snapshot
+holds every page, later ones hold only pages whose hash changed since the
+previous snapshot. `restore` rebuilds a database file from any snapshot in
+the chain.
+
+    python -m db.backup snapshot dev.db backups/ [--full]
+    python -m db.backup list backups/
+    python -m db.backup restore backups/ restored.db [--snapshot ID]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import tempfile
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+MAGIC = b"RWSNAP1\n"
+CATALOG = "catalog.json"
+_HASH_SIZE = 16
+_CHUNK = 1 << 20
+
+
+class SnapshotError(Exception):
+    """Raised for missing, corrupt or inconsistent snapshot files."""
+
+
+def online_copy(source: str, dest: str, pages: int = 256, sleep: float = 0.005,
+                progress: Optional[Callable[[int, int, int], None]] = None) -> None:
+    """
+    Copy a live SQLite database to `dest` with the online backup API.
+
+    Copies `pages` pages per step and sleeps between steps so writers are
+    not blocked; if another connection writes mid-copy SQLite restarts the
+    copy, so the result is always a consistent point-in-time image.
+    """
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(dest)
+    try:
+        with dst:
+            src.backup(dst, pages=pages, progress=progress, sleep=sleep)
+    finally:
+        dst.close()
+        src.close()
+
+
+def _page_size(path: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _page_hash(page: bytes) -> bytes:
+    return hashlib.blake2b(page, digest_size=_HASH_SIZE).digest()
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ----- Catalog -----
+
+def load_catalog(backup_dir: str) -> List[Dict[str, Any]]:
+    path = os.path.join(backup_dir, CATALOG)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_catalog(backup_dir: str, catalog: List[Dict[str, Any]]) -> None:
+    path = os.path.join(backup_dir, CATALOG)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(catalog, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _entry(catalog: List[Dict[str, Any]], snap_id: int) -> Dict[str, Any]:
+    for entry in catalog:
+        if entry["id"] == snap_id:
+            return entry
+    raise SnapshotError(f"Snapshot {snap_id} not found.")
+
+
+# ----- Snapshot files -----
+# Layout (zlib stream): MAGIC, u32 header length, JSON header,
+# page_count page hashes, then (u32 page number, page bytes) records.
+
+class _Writer:
+    def __init__(self, f) -> None:
+        self.f = f
+        self.z = zlib.compressobj(6)
+
+    def write(self, data: bytes) -> None:
+        self.f.write(self.z.compress(data))
+
+    def close(self) -> None:
+        self.f.write(self.z.flush())
+
+
+class _Reader:
+    def __init__(self, f) -> None:
+        self.f = f
+        self.z = zlib.decompressobj()
+        self.buf = bytearray()
+
+    def read(self, n: int) -> bytes:
+        while len(self.buf) < n:
+            block = self.f.read(_CHUNK)
+            if not block:
+                self.buf += self.z.flush()
+                break
+            self.buf += self.z.decompress(block)
+        if len(self.buf) < n:
+            raise SnapshotError("Snapshot file is truncated.")
+        out = bytes(self.buf[:n])
+        del self.buf[:n]
+        return out
+
+
+def _read_header(reader: _Reader) -> Dict[str, Any]:
+    if reader.read(len(MAGIC)) != MAGIC:
+        raise SnapshotError("Not a RentWise snapshot file.")
+    (length,) = struct.unpack(">I", reader.read(4))
+    return json.loads(reader.read(length))
+
+
+def _read_hashes(path: str) -> List[bytes]:
+    with open(path, "rb") as f:
+        reader = _Reader(f)
+        header = _read_header(reader)
+        raw = reader.read(header["page_count"] * _HASH_SIZE)
+    return [raw[i:i + _HASH_SIZE] for i in range(0, len(raw), _HASH_SIZE)]
+
+
+def snapshot(db_path: str, backup_dir: str, full: bool = False,
+             pages: int = 256, sleep: float = 0.005) -> Dict[str, Any]:
+    """
+    Take a snapshot of db_path into backup_dir and return its catalog entry.
+
+    The first snapshot (or full=True) stores every page; otherwise only
+    pages that differ from the previous snapshot are stored. A change of
+    page size (e.g. after VACUUM with a new page_size) forces a full one.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    catalog = load_catalog(backup_dir)
+    snap_id = catalog[-1]["id"] + 1 if catalog else 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image = os.path.join(tmp, "image.db")
+        online_copy(db_path, image, pages=pages, sleep=sleep)
+        page_size = _page_size(image)
+        size = os.path.getsize(image)
+        page_count = size // page_size
+
+        parent = None if full or not catalog else catalog[-1]
+        if parent is not None and parent["page_size"] != page_size:
+            parent = None
+        kind = "full" if parent is None else "incremental"
+        name = f"{snap_id:06d}-{kind}.snap"
+        path = os.path.join(backup_dir, name)
+
+        with open(image, "rb") as f:
+            hashes = [_page_hash(f.read(page_size)) for _ in range(page_count)]
+        old = _read_hashes(os.path.join(backup_dir, parent["file"])) if parent else []
+        changed = [i for i, h in enumerate(hashes) if i >= len(old) or old[i] != h]
+
+        header = {
+            "id": snap_id,
+            "kind": kind,
+            "parent": parent["id"] if parent else None,
+            "page_size": page_size,
+            "page_count": page_count,
+        }
+        blob = json.dumps(header).encode()
+        with open(image, "rb") as src, open(path + ".tmp", "wb") as out:
+            writer = _Writer(out)
+            writer.write(MAGIC + struct.pack(">I", len(blob)) + blob)
+            writer.write(b"".join(hashes))
+            for i in changed:
+                src.seek(i * page_size)
+                writer.write(struct.pack(">I", i) + src.read(page_size))
+            writer.close()
+        os.replace(path + ".tmp", path)
+
+    entry = {
+        **header,
+        "file": name,
+        "sha256": _file_sha256(path),
+        "pages_written": len(changed),
+        "bytes": os.path.getsize(path),
+        "source_bytes": size,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    catalog.append(entry)
+    _save_catalog(backup_dir, catalog)
+    return entry
+
+
+def restore(backup_dir: str, dest: str, snap_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Rebuild the database as of snapshot `snap_id` (default: latest) into dest.
+
+    Every file in the chain is checksum-verified before anything is written.
+    """
+    catalog = load_catalog(backup_dir)
+    if not catalog:
+        raise SnapshotError(f"No snapshots in {backup_dir}.")
+    target = _entry(catalog, snap_id) if snap_id is not None else catalog[-1]
+
+    chain = [target]
+    while chain[-1]["parent"] is not None:
+        chain.append(_entry(catalog, chain[-1]["parent"]))
+    chain.reverse()
+    for entry in chain:
+        if _file_sha256(os.path.join(backup_dir, entry["file"])) != entry["sha256"]:
+            raise SnapshotError(f"Checksum mismatch for {entry['file']}.")
+        if entry["page_size"] != target["page_size"]:
+            raise SnapshotError(
+                f"{entry['file']} has page size {entry['page_size']}, but snapshot "
+                f"{target['id']} has {target['page_size']}; the chain cannot be replayed."
+            )
+
+    page_size = target["page_size"]
+    tmp = dest + ".restoring"
+    try:
+        with open(tmp, "wb") as out:
+            for entry in chain:
+                with open(os.path.join(backup_dir, entry["file"]), "rb") as f:
+                    reader = _Reader(f)
+                    header = _read_header(reader)
+                    reader.read(header["page_count"] * _HASH_SIZE)
+                    for _ in range(entry["pages_written"]):
+                        (page_no,) = struct.unpack(">I", reader.read(4))
+                        page = reader.read(header["page_size"])
+                        if page_no < target["page_count"]:
+                            out.seek(page_no * page_size)
+                            out.write(page)
+            out.truncate(target["page_count"] * page_size)
+
+        conn = sqlite3.connect(tmp)
+        try:
+            if conn.execute("PRAGMA integrity_check").fetchone()[0] != "ok":
+                raise SnapshotError("Restored database failed integrity_check.")
+        finally:
+            conn.close()
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, dest)
+    return target
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m db.backup")
+    sub = parser.add_subparsers(dest="command", required=True)
+    snap = sub.add_parser("snapshot", help="take a full or incremental snapshot")
+    snap.add_argument("db")
+    snap.add_argument("backup_dir")
+    snap.add_argument("--full", action="store_true")
+    lst = sub.add_parser("list", help="list snapshots")
+    lst.add_argument("backup_dir")
+    rst = sub.add_parser("restore", help="restore a snapshot to a new file")
+    rst.add_argument("backup_dir")
+    rst.add_argument("dest")
+    rst.add_argument("--snapshot", type=int, default=None)
+    rst.add_argument("--force", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "snapshot":
+        e = snapshot(args.db, args.backup_dir, full=args.full)
+        print(f"Snapshot {e['id']} ({e['kind']}): {e['pages_written']}/{e['page_count']} pages, "
+              f"{e['bytes']} bytes -> {e['file']}")
+    elif args.command == "list":
+        for e in load_catalog(args.backup_dir):
+            print(f"{e['id']:>4}  {e['created_at']}  {e['kind']:<11} "
+                  f"{e['pages_written']:>7}/{e['page_count']:<7} pages  {e['bytes']} bytes")
+    elif args.command == "restore":
+        if os.path.exists(args.dest) and not args.force:
+            parser.error(f"{args.dest} exists; pass --force to overwrite it.")
+        e = restore(args.backup_dir, args.dest, args.snapshot)
+        print(f"Restored snapshot {e['id']} to {args.dest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# db/bulk.py
+"""
+Bulk loading for leases, payments and the other model tables.
+
+On PostgreSQL rows are streamed with COPY ... FROM STDIN (psycopg 3 or
+psycopg2); on other backends they go through chunked executemany INSERTs.
+Either way the whole load runs in the caller's transaction rather than
+committing per row.
+
+Rows are dicts keyed by column name ("amount", "date_paid", ...); unknown
+columns raise ValueError on every backend. Rows bypass the ORM, so model
+setters and change capture (db.cdc) do not run. The CHECK constraints still
+guard the data. Incremental jobs never see bulk-loaded rows, so after a
+load run them in full:
+
+    services.timeseries.refresh(session, full=True)
+    python -m services.late_fees --as-of ... --full
+
+    with engine.begin() as conn:
+        bulk_load(conn, Payment, rows)
+"""
+import csv
+import io
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from sqlalchemy import insert
+
+_CHUNK = 5000
+
+
+def _defaults(table, columns: Sequence[str]) -> Dict[str, Any]:
+    # Python-side scalar defaults (status="active", is_available=True) are
+    # applied by SQLAlchemy on INSERT but not by COPY, so fill them in here.
+    return {
+        col.name: col.default.arg
+        for col in table.columns
+        if col.name not in columns and col.default is not None and col.default.is_scalar
+    }
+
+
+def _rows(rows: Iterable[Dict[str, Any]], defaults: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    for row in rows:
+        yield {**defaults, **row} if defaults else row
+
+
+def _copy_psycopg(cursor, sql: str, columns: List[str], rows: Iterator[Dict[str, Any]]) -> int:
+    count = 0
+    with cursor.copy(sql) as copy:
+        for row in rows:
+            copy.write_row([row.get(c) for c in columns])
+            count += 1
+    return count
+
+
+def _copy_psycopg2(cursor, sql: str, columns: List[str], rows: Iterator[Dict[str, Any]]) -> int:
+    count = 0
+    while True:
+        chunk = list(islice(rows, _CHUNK))
+        if not chunk:
+            return count
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in chunk:
+            writer.writerow(["\\N" if row.get(c) is None else row[c] for c in columns])
+        buf.seek(0)
+        cursor.copy_expert(sql + " WITH (FORMAT csv, NULL '\\N')", buf)
+        count += len(chunk)
+
+
+def bulk_load(connection, model, rows: Iterable[Dict[str, Any]],
+              columns: Optional[Sequence[str]] = None) -> int:
+    """
+    Load rows into model's table on `connection` and return the row count.
+
+    `columns` defaults to the keys of the first row; id, timestamps and
+    version are filled by the database when omitted.
+    """
+    table = model.__table__
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    columns = list(columns or first)
+    unknown = [c for c in columns if c not in table.c]
+    if unknown:
+        raise ValueError(f"Unknown column(s) for {table.name}: {', '.join(unknown)}.")
+    defaults = _defaults(table, columns)
+    columns += list(defaults)
+    stream = _rows(_prepend(first, rows), defaults)
+
+    if connection.dialect.name == "postgresql":
+        quote = connection.dialect.identifier_preparer
+        sql = (f"COPY {quote.format_table(table)} "
+               f"({', '.join(quote.quote(c) for c in columns)}) FROM STDIN")
+        cursor = connection.connection.driver_connection.cursor()
+        try:
+            if hasattr(cursor, "copy"):
+                return _copy_psycopg(cursor, sql, columns, stream)
+            return _copy_psycopg2(cursor, sql, columns, stream)
+        finally:
+            cursor.close()
+
+    count = 0
+    while True:
+        chunk = list(islice(stream, _CHUNK))
+        if not chunk:
+            return count
+        connection.execute(insert(table), chunk)
+        count += len(chunk)
+
+
+def _prepend(first, rows: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    yield first
+    yield from rows
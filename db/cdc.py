@@ -0,0 +1,185 @@
+# db/cdc.py
+"""
+Change-data-capture for the RentWise models.
+
+Mapper events on Property, Tenant, Lease and Payment append a ChangeRecord
+(with a column-level diff) inside the same transaction as the flush, so a
+change is only visible to consumers once the originating write commits.
+
+Consumers resume from `seq > watermark`, which is only safe if changes
+become visible in seq order. SQLite has a single writer, so they do. On
+PostgreSQL, sequence values are handed out at INSERT time, so a later seq
+could commit first and an earlier one would be skipped for good. To prevent
+that, each writing transaction takes a transaction-scoped advisory lock
+before its first change row and holds it until commit. Writes to tracked
+tables are therefore serialised on PostgreSQL as well. Keep those
+transactions short.
+"""
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from sqlalchemy import event, func, inspect, insert, select, text
+from sqlalchemy.orm.attributes import NO_VALUE
+
+from models.change import ChangeRecord
+from models.property import Property
+from models.tenant import Tenant
+from models.lease import Lease
+from models.payment import Payment
+
+TRACKED_MODELS = (Property, Tenant, Lease, Payment)
+CDC_LOCK_KEY = 0x52574344  # advisory lock id ("RWCD") serialising writers on PostgreSQL
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _column_attrs(mapper):
+    # Yield (attribute key, column name) so diffs use DB names ("address"),
+    # not the private attribute names ("_address_col").
+    for attr in mapper.column_attrs:
+        yield attr.key, attr.columns[0].name
+
+
+def _row_diff(target, op: str) -> Dict[str, List[Any]]:
+    # Inserts and deletes snapshot every loaded column.
+    state = inspect(target)
+    diff: Dict[str, List[Any]] = {}
+    for key, column in _column_attrs(state.mapper):
+        value = state.attrs[key].loaded_value
+        if value is NO_VALUE:
+            continue  # server-generated and not yet loaded
+        value = _jsonable(value)
+        diff[column] = [None, value] if op == "insert" else [value, None]
+    return diff
+
+
+def _update_diff(mapper, connection, target) -> Dict[str, List[Any]]:
+    # Old values are only in the attribute history if they were loaded before
+    # the change (expire_on_commit discards them), so fetch the rest from the
+    # row itself; this runs before the UPDATE is emitted.
+    state = inspect(target)
+    changed, missing = {}, []
+    for key, column in _column_attrs(mapper):
+        hist = state.attrs[key].history
+        if not hist.added:
+            continue
+        changed[column] = [hist.deleted[0] if hist.deleted else NO_VALUE, hist.added[0]]
+        if not hist.deleted:
+            missing.append(column)
+    if missing:
+        table = mapper.local_table
+        row = connection.execute(
+            select(*(table.c[name] for name in missing)).where(table.c.id == target.id)
+        ).first()
+        for name in missing:
+            changed[name][0] = row._mapping[name] if row is not None else None
+    return {
+        column: [_jsonable(old), _jsonable(new)]
+        for column, (old, new) in changed.items()
+        if old != new
+    }
+
+
+def _serialise_writers(connection) -> None:
+    # Once per transaction: hold the CDC lock until commit so seq order is
+    # commit order (see module docstring).
+    if connection.dialect.name != "postgresql":
+        return
+    transaction = connection.get_transaction()
+    if connection.info.get("cdc_locked") is transaction:
+        return
+    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": CDC_LOCK_KEY})
+    connection.info["cdc_locked"] = transaction
+
+
+def _append(connection, mapper, target, op: str, diff: Dict[str, List[Any]]) -> None:
+    _serialise_writers(connection)
+    connection.execute(
+        insert(ChangeRecord.__table__),
+        {
+            "table_name": mapper.local_table.name,
+            "row_id": target.id,
+            "op": op,
+            "diff": json.dumps(diff),
+        },
+    )
+
+
+def record_changes(connection, table_name: str, op: str,
+                   rows: Iterable[Tuple[int, Dict[str, List[Any]]]]) -> int:
+    """
+    Append change rows for writes made with Core statements, which the
+    mapper events never see. `rows` is (row id, {column: [old, new]}).
+    Call it in the same transaction as the write. Returns rows appended.
+    """
+    params = [
+        {"table_name": table_name, "row_id": row_id, "op": op,
+         "diff": json.dumps({c: [_jsonable(old), _jsonable(new)] for c, (old, new) in diff.items()})}
+        for row_id, diff in rows
+    ]
+    if params:
+        _serialise_writers(connection)
+        connection.execute(insert(ChangeRecord.__table__), params)
+    return len(params)
+
+
+def _on_insert(mapper, connection, target) -> None:
+    _append(connection, mapper, target, "insert", _row_diff(target, "insert"))
+
+
+def _on_update(mapper, connection, target) -> None:
+    diff = _update_diff(mapper, connection, target)
+    if diff:
+        _append(connection, mapper, target, "update", diff)
+
+
+def _on_delete(mapper, connection, target) -> None:
+    _append(connection, mapper, target, "delete", _row_diff(target, "delete"))
+
+
+for _model in TRACKED_MODELS:
+    event.listen(_model, "after_insert", _on_insert)
+    event.listen(_model, "before_update", _on_update)
+    event.listen(_model, "after_delete", _on_delete)
+
+
+# ----- Consumer API -----
+
+def latest_seq(session) -> int:
+    """Return the highest sequence number written so far (0 if none)."""
+    return session.execute(select(func.max(ChangeRecord.seq))).scalar() or 0
+
+
+def changes_since(session, after_seq: int = 0, limit: int = 500) -> List[ChangeRecord]:
+    """Return up to `limit` changes with seq > after_seq, oldest first."""
+    stmt = (
+        select(ChangeRecord)
+        .where(ChangeRecord.seq > after_seq)
+        .order_by(ChangeRecord.seq)
+        .limit(limit)
+    )
+    return list(session.scalars(stmt))
+
+
+def tail_changes(session, after_seq: int = 0, batch_size: int = 500) -> Iterator[List[ChangeRecord]]:
+    """
+    Yield batches of changes after `after_seq` until caught up.
+
+    Consumers should persist `batch[-1].seq` after processing each batch and
+    pass it back in as `after_seq` on the next sync. Resuming this way never
+    skips a change, because seq order is commit order (see the module docstring).
+    """
+    while True:
+        batch = changes_since(session, after_seq, batch_size)
+        if not batch:
+            return
+        yield batch
+        after_seq = batch[-1].seq
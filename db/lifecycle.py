@@ -0,0 +1,97 @@
+# db/lifecycle.py
+"""
+Session lifecycle management for long-running CLI sessions.
+
+Instead of one Session for the whole interactive run, the CLI asks a
+SessionManager for a session per action. The session is closed and replaced
+after `actions_per_session` actions, and its identity map is cleared early
+if it grows past `max_identity_map` objects, so memory and flush cost stay
+flat however long the front desk keeps the program open.
+"""
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+
+class SessionManager:
+    """Hands out sessions per CLI action and recycles them on thresholds."""
+
+    def __init__(self, session_factory, actions_per_session: int = 1,
+                 max_identity_map: int = 5000) -> None:
+        if actions_per_session < 1:
+            raise ValueError("actions_per_session must be at least 1.")
+        self.session_factory = session_factory
+        self.actions_per_session = actions_per_session
+        self.max_identity_map = max_identity_map
+        self._session: Optional[Session] = None
+        self._actions_in_session = 0
+        self.actions = 0
+        self.sessions_opened = 0
+        self.recycles = 0
+        self.expunges = 0
+        self.peak_identity_map = 0
+
+    @property
+    def session(self) -> Session:
+        """The current session, opened on first use."""
+        if self._session is None:
+            self._session = self.session_factory()
+            self.sessions_opened += 1
+            self._actions_in_session = 0
+        return self._session
+
+    @contextmanager
+    def action(self) -> Iterator[Session]:
+        """Scope one CLI action; uncommitted work is rolled back on error."""
+        session = self.session
+        try:
+            yield session
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            self.actions += 1
+            self._actions_in_session += 1
+            self._after_action()
+
+    def _after_action(self) -> None:
+        size = len(self._session.identity_map)
+        self.peak_identity_map = max(self.peak_identity_map, size)
+        if self._actions_in_session >= self.actions_per_session:
+            self.recycle()
+        elif size > self.max_identity_map:
+            # Anything still pending was never committed by the action.
+            self._session.rollback()
+            self._session.expunge_all()
+            self.expunges += 1
+
+    def recycle(self) -> None:
+        """Close the current session; the next action opens a fresh one."""
+        if self._session is None:
+            return
+        self._session.close()
+        # scoped_session keeps returning the same thread-local Session
+        # until it is removed from its registry.
+        remove = getattr(self.session_factory, "remove", None)
+        if remove is not None:
+            remove()
+        self._session = None
+        self.recycles += 1
+
+    def close(self) -> None:
+        self.recycle()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters plus current identity-map size and traced memory."""
+        return {
+            "actions": self.actions,
+            "sessions_opened": self.sessions_opened,
+            "recycles": self.recycles,
+            "expunges": self.expunges,
+            "identity_map_size": len(self._session.identity_map) if self._session is not None else 0,
+            "peak_identity_map": self.peak_identity_map,
+            # Only available while tracemalloc is tracing (python -X tracemalloc)
+            "traced_memory_bytes": tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None,
+        }
@@ -48,6 +48,12 @@ def init_db() -> None:
     from models import tenant    # noqa: F401
     from models import lease     # noqa: F401
     from models import payment   # noqa: F401
+    from models import change    # noqa: F401
+    from models import watermark # noqa: F401
+    from models import rollup    # noqa: F401
+    from models import charge    # noqa: F401
+    from models import outbox    # noqa: F401
+    import db.cdc                # noqa: F401
 
     engine = get_engine()
     Base.metadata.create_all(engine)
@@ -0,0 +1,278 @@
+# db/sharding.py
+"""
+Per-agency sharding across SQLite files.
+
+Each agency's properties, tenants, leases and payments live in their own
+database file (<shard_dir>/<agency>.db). `make_sharded_session` returns a
+session factory that routes writes to the right file and fans reads out to
+every shard; `fan_out` runs a function against every shard in parallel for
+global reports; `split_database` splits an existing single-file database.
+
+    python -m db.sharding split dev.db shards/ agencies.csv
+"""
+import argparse
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import create_engine, inspect as orm_inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import object_session, sessionmaker, Session
+
+from models import Base
+from models.property import Property
+from models.tenant import Tenant
+from models.lease import Lease
+from models.payment import Payment
+import db.cdc  # noqa: F401  (change capture applies per shard as well)
+
+SHARD_DIR = os.getenv("RENTWISE_SHARD_DIR", "shards")
+
+
+def _sqlite_engine(path: str) -> Engine:
+    return create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+    )
+
+
+def shard_engines(shard_dir: str = SHARD_DIR) -> Dict[str, Engine]:
+    """Return {agency: engine} for every <agency>.db file in shard_dir."""
+    engines = {}
+    if os.path.isdir(shard_dir):
+        for name in sorted(os.listdir(shard_dir)):
+            if name.endswith(".db"):
+                engines[name[:-3]] = _sqlite_engine(os.path.join(shard_dir, name))
+    return engines
+
+
+def create_shard(agency: str, shard_dir: str = SHARD_DIR) -> Engine:
+    """Create (or open) the database file for a new agency."""
+    os.makedirs(shard_dir, exist_ok=True)
+    engine = _sqlite_engine(os.path.join(shard_dir, f"{agency}.db"))
+    Base.metadata.create_all(engine)
+    return engine
+
+
+# ----- Routing -----
+
+def _parent_by_fk(session, model, ident: int):
+    # Find the shard holding model(ident). Primary keys are only unique
+    # within a shard, so prefer the session's agency and refuse to guess
+    # when several other shards have the id.
+    shard_ids = session.info.get("shards", ())
+    agency = session.info.get("agency")
+    order = sorted(shard_ids, key=lambda token: token != agency)
+    found = []
+    with session.no_autoflush:
+        for token in order:
+            parent = session.get(model, ident, identity_token=token,
+                                 execution_options={"agency": token})
+            if parent is not None:
+                if token == agency:
+                    return token
+                found.append(token)
+    if len(found) > 1:
+        raise ValueError(
+            f"{model.__name__} {ident} exists in shards {found}; open the session with its agency."
+        )
+    if not found:
+        raise ValueError(f"{model.__name__} {ident} not found in any shard.")
+    return found[0]
+
+
+def _resolve_shard(instance) -> Optional[str]:
+    # Persistent objects stay where they were loaded from; new leases and
+    # payments follow their parent (by relationship, else by foreign key);
+    # anything else goes to the session's agency.
+    state = orm_inspect(instance)
+    if state.key is not None:
+        return state.identity_token
+    session = object_session(instance)
+    if isinstance(instance, (Lease, Payment)):
+        if isinstance(instance, Lease):
+            parent, model, fk = instance.property, Property, instance.property_id
+        else:
+            parent, model, fk = instance.lease, Lease, instance.lease_id
+        if parent is not None:
+            return _resolve_shard(parent)
+        if fk is not None and session is not None:
+            return _parent_by_fk(session, model, fk)
+    return session.info.get("agency") if session is not None else None
+
+
+def _shard_chooser(mapper, instance, clause=None) -> str:
+    token = _resolve_shard(instance)
+    if token is None:
+        raise ValueError(
+            f"Cannot choose a shard for {instance!r}; open the session with an agency."
+        )
+    return token
+
+
+def make_sharded_session(engines: Optional[Dict[str, Engine]] = None,
+                         agency: Optional[str] = None) -> sessionmaker:
+    """
+    Return a session factory over all shards.
+
+    `agency` becomes the default shard for new rows that cannot be routed
+    through a parent object. Reads fan out to every shard unless executed
+    with `execution_options(agency=...)`.
+    """
+    engines = engines if engines is not None else shard_engines()
+    shard_ids = list(engines)
+
+    def identity_chooser(mapper, primary_key, *, lazy_loaded_from,
+                         execution_options, bind_arguments, **kw) -> Iterable[str]:
+        if lazy_loaded_from is not None:
+            return [lazy_loaded_from.identity_token]
+        target = execution_options.get("agency")
+        return [target] if target else shard_ids
+
+    def execute_chooser(context) -> Iterable[str]:
+        if context.lazy_loaded_from is not None:
+            return [context.lazy_loaded_from.identity_token]
+        target = context.execution_options.get("agency")
+        return [target] if target else shard_ids
+
+    return sessionmaker(
+        class_=ShardedSession,
+        shards=engines,
+        shard_chooser=_shard_chooser,
+        identity_chooser=identity_chooser,
+        execute_chooser=execute_chooser,
+        info={"agency": agency, "shards": shard_ids},
+    )
+
+
+# ----- Parallel fan-out -----
+
+def fan_out(fn: Callable[[Session], Any], engines: Optional[Dict[str, Engine]] = None,
+            max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Run fn(session) against every shard in parallel, one plain Session per
+    shard, and return {agency: result}. Use for global reports.
+    """
+    engines = engines if engines is not None else shard_engines()
+
+    def run(item):
+        agency, engine = item
+        with Session(engine) as session:
+            return agency, fn(session)
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(engines) or 1) as pool:
+        return dict(pool.map(run, engines.items()))
+
+
+# ----- Splitting an existing database -----
+
+def load_assignments(path: str) -> Dict[int, str]:
+    """Read a property_id,agency CSV into {property_id: agency}."""
+    with open(path, newline="") as f:
+        return {int(row["property_id"]): row["agency"].strip() for row in csv.DictReader(f)}
+
+
+def split_database(source_url: str, shard_dir: str, assignments: Dict[int, str],
+                   default_agency: str = "unassigned") -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    Copy rows from a single database into per-agency shard files.
+
+    Properties are assigned by `assignments`; their leases and payments
+    follow them, and each tenant is copied into every agency it leases from
+    (tenants with no leases go to `default_agency`). Primary keys are kept.
+    Orphans are copied rather than dropped: leases whose property is missing,
+    and payments whose lease is missing, go to `default_agency`; a lease
+    whose tenant is missing stays with its property, without a tenant row.
+    Refuses to run if any of the target shard files already exists.
+    Returns ({agency: properties copied}, {"leases": n, "payments": n}
+    orphans found).
+    """
+    source = create_engine(source_url)
+    props = Property.__table__
+    tenants = Tenant.__table__
+    leases = Lease.__table__
+    payments = Payment.__table__
+
+    with source.connect() as conn:
+        prop_rows = conn.execute(select(props)).mappings().all()
+        tenant_rows = {r["id"]: r for r in conn.execute(select(tenants)).mappings()}
+        lease_rows = conn.execute(select(leases)).mappings().all()
+        payment_rows = conn.execute(select(payments)).mappings().all()
+
+    agency_of_prop = {r["id"]: assignments.get(r["id"], default_agency) for r in prop_rows}
+    agency_of_lease = {r["id"]: agency_of_prop.get(r["property_id"], default_agency) for r in lease_rows}
+    orphans = {
+        "leases": sum(1 for r in lease_rows
+                      if r["property_id"] not in agency_of_prop or r["tenant_id"] not in tenant_rows),
+        "payments": sum(1 for r in payment_rows if r["lease_id"] not in agency_of_lease),
+    }
+
+    buckets: Dict[str, Dict[str, List[Any]]] = {}
+
+    def bucket(agency):
+        return buckets.setdefault(agency, {"properties": [], "tenants": {}, "leases": [], "payments": []})
+
+    for r in prop_rows:
+        bucket(agency_of_prop[r["id"]])["properties"].append(dict(r))
+    leased = set()
+    for r in lease_rows:
+        b = bucket(agency_of_lease[r["id"]])
+        b["leases"].append(dict(r))
+        if r["tenant_id"] in tenant_rows:
+            b["tenants"][r["tenant_id"]] = dict(tenant_rows[r["tenant_id"]])
+            leased.add(r["tenant_id"])
+    for tid, r in tenant_rows.items():
+        if tid not in leased:
+            bucket(default_agency)["tenants"][tid] = dict(r)
+    for r in payment_rows:
+        bucket(agency_of_lease.get(r["lease_id"], default_agency))["payments"].append(dict(r))
+
+    existing = [a for a in buckets if os.path.exists(os.path.join(shard_dir, f"{a}.db"))]
+    if existing:
+        raise FileExistsError(
+            f"Shard files already exist in {shard_dir} for: {', '.join(sorted(existing))}. "
+            "Remove them (or choose another directory) before splitting."
+        )
+
+    # Plain Core inserts: a split is a copy, not a change to capture.
+    counts = {}
+    for agency, b in buckets.items():
+        engine = create_shard(agency, shard_dir)
+        with engine.begin() as conn:
+            for table, rows in ((props, b["properties"]), (tenants, list(b["tenants"].values())),
+                                (leases, b["leases"]), (payments, b["payments"])):
+                if rows:
+                    conn.execute(table.insert(), rows)
+        counts[agency] = len(b["properties"])
+    return counts, orphans
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m db.sharding")
+    sub = parser.add_subparsers(dest="command", required=True)
+    split = sub.add_parser("split", help="split a database into per-agency shard files")
+    split.add_argument("source", help="source SQLite file, e.g. dev.db")
+    split.add_argument("shard_dir", help="output directory for <agency>.db files")
+    split.add_argument("assignments", help="CSV with property_id,agency columns")
+    split.add_argument("--default-agency", default="unassigned")
+    args = parser.parse_args(argv)
+
+    if args.command == "split":
+        try:
+            counts, orphans = split_database(
+                f"sqlite:///{args.source}", args.shard_dir,
+                load_assignments(args.assignments), args.default_agency,
+            )
+        except FileExistsError as exc:
+            parser.exit(1, f"{exc}\n")
+        for agency, n in sorted(counts.items()):
+            print(f"{agency}: {n} properties")
+        if any(orphans.values()):
+            print(f"Copied {orphans['leases']} orphan leases and {orphans['payments']} orphan payments "
+                  f"(missing property, tenant or lease); review them with `python -m services.integrity`.")
+
+
+if __name__ == "__main__":
+    main()
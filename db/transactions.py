@@ -0,0 +1,163 @@
+# db/transactions.py
+"""
+Retrying transactions for concurrent writers.
+
+`run_in_transaction` runs a unit of work in a fresh session and retries it
+with bounded exponential backoff when it loses a race: SQLite lock
+contention ("database is locked"/"busy"), PostgreSQL serialization or
+deadlock failures, or an optimistic-lock conflict (StaleDataError). Each
+attempt starts from a new session, so the work re-reads current data.
+
+`commit_with_retry` commits inside a session the caller already owns (the
+CLI's per-action session) and retries only lock/serialization failures. A
+StaleDataError propagates there. The user decided on data that has since
+changed, so they should see it rather than have their change re-applied
+over someone else's. The rollback before a retry reloads every object, so
+the versions loaded before the first attempt are checked again first.
+`conflict_message` turns either outcome into a message for the user.
+"""
+import random
+import time
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from sqlalchemy import inspect as orm_inspect
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm.exc import ObjectDeletedError, StaleDataError
+
+R = TypeVar("R")
+
+# PostgreSQL SQLSTATEs: serialization_failure, deadlock_detected
+_RETRYABLE_SQLSTATES = {"40001", "40P01"}
+_RETRYABLE_MESSAGES = ("database is locked", "database table is locked", "database is busy")
+
+
+class TransactionRetryError(Exception):
+    """Raised when a transaction still conflicts after every retry."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True if `exc` is a transient concurrency failure worth retrying."""
+    if isinstance(exc, StaleDataError):
+        return True
+    if isinstance(exc, DBAPIError):
+        sqlstate = getattr(exc.orig, "pgcode", None) or getattr(exc.orig, "sqlstate", None)
+        if sqlstate in _RETRYABLE_SQLSTATES:
+            return True
+        if isinstance(exc, OperationalError):
+            message = str(exc.orig).lower()
+            return any(m in message for m in _RETRYABLE_MESSAGES)
+    return False
+
+
+def _backoff(attempt: int, base_delay: float, max_delay: float) -> None:
+    time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+
+
+def run_in_transaction(session_factory, work: Callable[..., R], *,
+                       retries: int = 8, base_delay: float = 0.01,
+                       max_delay: float = 1.0,
+                       on_retry: Optional[Callable[[int, BaseException], None]] = None) -> R:
+    """
+    Call work(session) and commit, retrying transient conflicts.
+
+    Backoff doubles from `base_delay` up to `max_delay` with full jitter.
+    Non-retryable errors propagate immediately; after `retries` failed
+    retries a TransactionRetryError is raised from the last conflict.
+    """
+    attempt = 0
+    while True:
+        session = session_factory()
+        try:
+            result = work(session)
+            session.commit()
+            return result
+        except Exception as exc:
+            session.rollback()
+            if not is_retryable(exc):
+                raise
+            if attempt >= retries:
+                raise TransactionRetryError(
+                    f"Transaction failed after {attempt + 1} attempts: {exc}"
+                ) from exc
+            if on_retry is not None:
+                on_retry(attempt, exc)
+            _backoff(attempt, base_delay, max_delay)
+            attempt += 1
+        finally:
+            session.close()
+
+
+def _loaded_versions(session) -> Dict[object, Tuple[str, object]]:
+    """{state: (version attribute, version)} for loaded versioned objects."""
+    versions = {}
+    for obj in list(session.identity_map.values()):
+        state = orm_inspect(obj)
+        column = state.mapper.version_id_col
+        if column is None:
+            continue
+        key = state.mapper.get_property_by_column(column).key
+        if key in state.dict:
+            versions[state] = (key, state.dict[key])
+    return versions
+
+
+def _check_versions(versions: Dict[object, Tuple[str, object]]) -> None:
+    """Raise StaleDataError if another session changed or deleted one of the objects."""
+    for state, (key, version) in versions.items():
+        obj = state.obj()
+        if obj is None or state.detached:
+            continue
+        try:
+            current = getattr(obj, key)
+        except ObjectDeletedError:
+            current = None
+        if current != version:
+            raise StaleDataError(
+                f"{state.mapper.class_.__name__} {state.identity} was changed by "
+                f"another session (version {version} -> {current})."
+            )
+
+
+def commit_with_retry(session, work: Callable[..., R], *,
+                      retries: int = 8, base_delay: float = 0.01,
+                      max_delay: float = 1.0) -> R:
+    """
+    Call work(session) and commit in an existing session, retrying lock and
+    serialization failures (not StaleDataError).
+
+    `work` must re-apply its changes from scratch on every call, because the
+    rollback between attempts discards pending changes. Before a retry the
+    objects the session had loaded are reloaded, and StaleDataError is
+    raised if any of their versions moved on. On failure the session is
+    left rolled back but open.
+    """
+    versions = _loaded_versions(session)
+    attempt = 0
+    while True:
+        try:
+            if attempt:
+                _check_versions(versions)
+            result = work(session)
+            session.commit()
+            return result
+        except Exception as exc:
+            session.rollback()
+            if isinstance(exc, StaleDataError) or not is_retryable(exc):
+                raise
+            if attempt >= retries:
+                raise TransactionRetryError(
+                    f"Transaction failed after {attempt + 1} attempts: {exc}"
+                ) from exc
+            _backoff(attempt, base_delay, max_delay)
+            attempt += 1
+
+
+def conflict_message(exc: BaseException) -> Optional[str]:
+    """A user-facing message for a concurrency failure, or None for other errors."""
+    if isinstance(exc, TransactionRetryError):
+        exc = exc.__cause__ or exc
+    if isinstance(exc, StaleDataError):
+        return "This record was changed or removed by another user. Reload it and try again."
+    if isinstance(exc, TransactionRetryError) or is_retryable(exc):
+        return "The database is busy with another user's changes. Please try again in a moment."
+    return None
@@ -1,6 +1,6 @@
 # retwise_pro/init_db.py
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, scoped_session
 from models import Base
 
@@ -9,20 +9,64 @@ from models.property import Property
 from models.tenant import Tenant
 from models.lease import Lease
 from models.payment import Payment
+from models.change import ChangeRecord
+from models.watermark import Watermark
+from models.rollup import PaymentRollup
+from models.charge import Charge
+from models.outbox import OutboxMessage
+
+# Registers change-data-capture listeners on the models above
+import db.cdc  # noqa: F401
 
 # Allow DB URL to be overridden via environment variable
 DB_URL = os.getenv("RENTWISE_DB_URL", "sqlite:///dev.db")
 
 # Create a single reusable engine
+if DB_URL.startswith("sqlite"):
+    engine_options = {"connect_args": {"check_same_thread": False}}
+else:
+    # PostgreSQL (postgresql+psycopg://...): drop dead pooled connections
+    engine_options = {"pool_pre_ping": True}
+
 engine = create_engine(
     DB_URL,
     echo=True,
-    connect_args={"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
+    **engine_options
 )
 
 # Thread‑safe session factory
 SessionLocal = scoped_session(sessionmaker(bind=engine))
 
+# (table, column, DDL type) for columns added after the first release
+_ADDED_COLUMNS = (
+    ("properties", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("tenants", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("leases", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ("payments", "version", "INTEGER NOT NULL DEFAULT 1"),
+)
+
+def upgrade_schema(bind=None) -> None:
+    """
+    Add columns introduced after a database was first created
+    (create_all only creates missing tables, not missing columns).
+    """
+    bind = bind if bind is not None else engine
+    inspector = inspect(bind)
+    existing = set(inspector.get_table_names())
+    with bind.begin() as conn:
+        for table, column, ddl in _ADDED_COLUMNS:
+            if table not in existing:
+                continue
+            columns = {c["name"] for c in inspector.get_columns(table)}
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        # Indexes added to the models later (CHECK constraints cannot be
+        # added to an existing SQLite table and apply to new databases only)
+        for table in Base.metadata.sorted_tables:
+            if table.name in existing:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+
 def init_db(drop_existing: bool = False) -> None:
     """
     Initialize the database schema.
@@ -33,6 +77,7 @@ def init_db(drop_existing: bool = False) -> None:
         Base.metadata.drop_all(engine)
     print("Creating all tables...")
     Base.metadata.create_all(engine)
+    upgrade_schema()
     print(" Database tables created successfully!")
 
 if __name__ == "__main__":
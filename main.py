@@ -1,12 +1,18 @@
 # rentwise_pro/main.py
+import os
 from init_db import init_db, SessionLocal
+from db.lifecycle import SessionManager
 from cli.property_menu import property_menu
 from cli.tenant_menu import tenant_menu
 from cli.lease_menu import lease_menu
 from utils import pause
 
 def main():
-    session = SessionLocal()
+    # One session per action (or per N actions) keeps memory flat in long runs
+    sessions = SessionManager(
+        SessionLocal,
+        actions_per_session=int(os.getenv("RENTWISE_ACTIONS_PER_SESSION", "1")),
+    )
     actions = {
         "1": ("Properties", property_menu),
         "2": ("Tenants", tenant_menu),
@@ -31,13 +37,13 @@ def main():
             continue
 
         try:
-            action[1](session)
+            action[1](sessions)
         except Exception as e:
             print(f"❌ Error running '{action[0]}': {e}")
             import traceback; traceback.print_exc()
             pause()
 
-    session.close()
+    sessions.close()
 
 if __name__ == "__main__":
     init_db()  # Ensures DB is ready
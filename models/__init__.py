@@ -1,11 +1,19 @@
 # models/__init__.py
-from sqlalchemy.orm import declarative_base, Mapped, mapped_column
-from sqlalchemy import DateTime, func, Integer
-from typing import Type, TypeVar, List, Any, Optional
+import importlib
+from sqlalchemy.orm import declarative_base, declared_attr, Mapped, mapped_column
+from sqlalchemy import DateTime, func, Integer, select, bindparam
+from sqlalchemy.sql import Select
+from typing import Type, TypeVar, List, Any, Optional, Dict, Iterator, Tuple
+from db.transactions import commit_with_retry
 
 Base = declarative_base()
 T = TypeVar("T", bound="CRUDMixin")
 
+# Prebuilt select() statements keyed by (model, access path, filter columns).
+# Reusing the same statement object with bound parameters skips rebuilding the
+# query on every call and always hits SQLAlchemy's compiled-SQL cache.
+_STMT_CACHE: Dict[Tuple[Any, ...], Select] = {}
+
 
 class TimestampMixin:
     """Mixin adding created_at / updated_at timestamps."""
@@ -33,6 +41,30 @@ class TimestampMixin:
         return self._updated_at_col
 
 
+class VersionMixin:
+    """
+    Optimistic concurrency via a version column.
+
+    Every UPDATE/DELETE is matched on the version the row was loaded with;
+    if another session changed it first, the flush raises StaleDataError.
+    """
+
+    _version_col: Mapped[int] = mapped_column(
+        "version",
+        Integer,
+        server_default="1",
+        nullable=False
+    )
+
+    @declared_attr.directive
+    def __mapper_args__(cls) -> dict:
+        return {"version_id_col": cls._version_col}
+
+    @property
+    def version(self) -> int:
+        return self._version_col
+
+
 class CRUDMixin:
     """Basic CRUD helpers with a private id column."""
 
@@ -42,27 +74,69 @@ class CRUDMixin:
     def id(self) -> int:
         return self._id_col
 
+    # Writes retry transient lock failures (db.transactions.commit_with_retry);
+    # a lock that outlasts the retries raises TransactionRetryError.
+
     @classmethod
     def create(cls: Type[T], session, **kwargs) -> T:
         obj = cls(**kwargs)
-        session.add(obj)
-        session.commit()
+        commit_with_retry(session, lambda s: s.add(obj))
         session.refresh(obj)
         return obj
 
     def delete(self, session) -> None:
-        session.delete(self)
-        session.commit()
+        commit_with_retry(session, lambda s: s.delete(self))
+
+    @classmethod
+    def _cached_select(cls, *columns: str) -> Select:
+        key = (cls, columns)
+        stmt = _STMT_CACHE.get(key)
+        if stmt is None:
+            table = cls.__table__
+            for name in columns:
+                if name not in table.c:
+                    raise ValueError(f"Unknown attribute '{name}' for {cls.__name__}.")
+            stmt = select(cls).where(*(table.c[name] == bindparam(name) for name in columns))
+            _STMT_CACHE[key] = stmt
+        return stmt
 
     @classmethod
     def get_all(cls: Type[T], session) -> List[T]:
-        return session.query(cls).all()
+        return list(session.scalars(cls._cached_select()))
+
+    @classmethod
+    def iter_all(cls: Type[T], session, batch_size: int = 1000) -> Iterator[T]:
+        """
+        Stream every row in batches instead of loading them all at once.
+        On PostgreSQL this uses a server-side cursor (yield_per implies
+        stream_results).
+        """
+        yield from session.scalars(
+            cls._cached_select().order_by(cls._id_col),
+            execution_options={"yield_per": batch_size},
+        )
 
     @classmethod
     def find_by_id(cls: Type[T], session, obj_id: int) -> Optional[T]:
-        # Must use filter() with attribute comparison, not filter_by()
-        return session.query(cls).filter(cls._id_col == obj_id).first()
+        # Session.get() answers from the identity map without SQL when possible
+        return session.get(cls, obj_id)
 
     @classmethod
     def find_by_attribute(cls: Type[T], session, **kwargs) -> List[T]:
-        return session.query(cls).filter_by(**kwargs).all()
+        # Keys are column names ("address", "status"), which are also the
+        # public accessor names on every model.
+        columns = tuple(sorted(kwargs))
+        return list(session.scalars(cls._cached_select(*columns), kwargs))
+
+
+MODEL_MODULES = ("property", "tenant", "lease", "payment", "change",
+                 "watermark", "rollup", "charge", "outbox")
+
+
+def import_all() -> None:
+    """
+    Import every model module so relationship() names like "Lease" resolve
+    in scripts that only use one or two models directly.
+    """
+    for name in MODEL_MODULES:
+        importlib.import_module(f"models.{name}")
@@ -0,0 +1,42 @@
+# models/change.py
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, Integer, String, Text, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Any, Dict
+from models import Base
+
+
+class ChangeRecord(Base):
+    """
+    Append-only change-data-capture row.
+
+    One row is written per inserted/updated/deleted model row; `seq` is
+    monotonically increasing (AUTOINCREMENT on SQLite never reuses ids),
+    so consumers can resume from the last sequence they processed.
+    """
+    __tablename__ = "changes"
+    __table_args__ = (
+        Index("ix_changes_table_row", "table_name", "row_id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    table_name: Mapped[str] = mapped_column(String(50), nullable=False)
+    row_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[str] = mapped_column(String(10), nullable=False)  # insert, update, delete
+    _diff_col: Mapped[str] = mapped_column("diff", Text, nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), nullable=False
+    )
+
+    @property
+    def diff(self) -> Dict[str, Any]:
+        """Column-level diff as {column: [old, new]}."""
+        return json.loads(self._diff_col)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ChangeRecord seq={self.seq} table='{self.table_name}' "
+            f"row_id={self.row_id} op='{self.op}'>"
+        )
@@ -0,0 +1,37 @@
+# models/charge.py
+from sqlalchemy import Date, ForeignKey, Numeric, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column, relationship, backref
+from datetime import date
+from decimal import Decimal
+from models import Base, CRUDMixin, TimestampMixin
+
+
+class Charge(CRUDMixin, TimestampMixin, Base):
+    """
+    A non-rent charge against a lease, e.g. a late fee.
+
+    (lease_id, kind, period) is unique so batch jobs can re-run and
+    overwrite their own charges idempotently.
+    """
+    __tablename__ = "charges"
+    __table_args__ = (
+        UniqueConstraint("lease_id", "kind", "period", name="uq_charges_lease_kind_period"),
+    )
+
+    lease_id: Mapped[int] = mapped_column(
+        ForeignKey("leases.id"), nullable=False, index=True
+    )
+    kind: Mapped[str] = mapped_column(String(20), nullable=False)  # e.g. late_fee
+    period: Mapped[date] = mapped_column(Date, nullable=False)     # rent due date
+    amount: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    assessed_on: Mapped[date] = mapped_column(Date, nullable=False)
+
+    lease: Mapped["Lease"] = relationship(
+        "Lease", backref=backref("charges", cascade="all, delete-orphan")
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<Charge id={self.id} lease_id={self.lease_id} kind='{self.kind}' "
+            f"period={self.period} amount={self.amount}>"
+        )
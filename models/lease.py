@@ -1,21 +1,27 @@
 # models/lease.py
-from sqlalchemy import Date, ForeignKey, String
+from sqlalchemy import CheckConstraint, Date, ForeignKey, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 from datetime import date
 from typing import Optional, List
-from models import Base, CRUDMixin, TimestampMixin
+from db.transactions import commit_with_retry
+from models import Base, CRUDMixin, TimestampMixin, VersionMixin
 
 
-class Lease(CRUDMixin, TimestampMixin, Base):
+class Lease(CRUDMixin, TimestampMixin, VersionMixin, Base):
     __tablename__ = "leases"
+    __table_args__ = (
+        CheckConstraint(
+            "end_date IS NULL OR end_date > start_date", name="ck_leases_end_after_start"
+        ),
+    )
 
     # Foreign keys
     property_id: Mapped[int] = mapped_column(
-        ForeignKey("properties.id"), nullable=False
+        ForeignKey("properties.id"), nullable=False, index=True
     )
     tenant_id: Mapped[int] = mapped_column(
-        ForeignKey("tenants.id"), nullable=False
+        ForeignKey("tenants.id"), nullable=False, index=True
     )
 
     # Internal date columns (safe names)
@@ -55,6 +61,19 @@ class Lease(CRUDMixin, TimestampMixin, Base):
                 raise ValueError("end_date must be after start_date.")
         self._end_date = value
 
+    def end(self, session, end_date: date) -> None:
+        """
+        Mark the lease ended on end_date and commit.
+
+        Lock contention is retried. Raises StaleDataError if another session
+        changed the lease since it was loaded (see VersionMixin).
+        """
+        def apply(_session) -> None:
+            self.lease_end = end_date
+            self.status = "ended"
+
+        commit_with_retry(session, apply)
+
     def __repr__(self) -> str:
         return (
             f"<Lease id={self.id} property_id={self.property_id} "
@@ -0,0 +1,40 @@
+# models/outbox.py
+from datetime import datetime
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Optional
+from models import Base
+
+
+class OutboxMessage(Base):
+    """
+    A queued tenant notification.
+
+    `dedup_key` is unique, so enqueuing the same reminder twice is a no-op.
+    Dispatchers claim rows by pushing `next_attempt_at` forward; a claim
+    that is never completed simply becomes due again.
+    """
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("ix_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    dedup_key: Mapped[str] = mapped_column(String(120), nullable=False, unique=True)
+    tenant_id: Mapped[int] = mapped_column(ForeignKey("tenants.id"), nullable=False)
+    channel: Mapped[str] = mapped_column(String(10), nullable=False)     # email, sms
+    recipient: Mapped[str] = mapped_column(String(120), nullable=False)
+    subject: Mapped[str] = mapped_column(String(200), nullable=False)
+    body: Mapped[str] = mapped_column(Text, nullable=False)
+    status: Mapped[str] = mapped_column(String(10), nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.now)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self) -> str:
+        return (
+            f"<OutboxMessage id={self.id} key='{self.dedup_key}' channel='{self.channel}' "
+            f"status='{self.status}' attempts={self.attempts}>"
+        )
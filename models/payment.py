@@ -1,18 +1,21 @@
 # models/payment.py
-from sqlalchemy import Numeric, Date, ForeignKey, String
+from sqlalchemy import CheckConstraint, Numeric, Date, ForeignKey, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import date
 from decimal import Decimal, InvalidOperation
 from typing import Optional
-from models import Base, CRUDMixin, TimestampMixin
+from models import Base, CRUDMixin, TimestampMixin, VersionMixin
 
 
-class Payment(CRUDMixin, TimestampMixin, Base):
+class Payment(CRUDMixin, TimestampMixin, VersionMixin, Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        CheckConstraint("amount > 0", name="ck_payments_amount_positive"),
+    )
 
     # Foreign key to Lease
     lease_id: Mapped[int] = mapped_column(
-        ForeignKey("leases.id"), nullable=False
+        ForeignKey("leases.id"), nullable=False, index=True
     )
 
     # Collision-proof private columns
@@ -20,7 +23,7 @@ class Payment(CRUDMixin, TimestampMixin, Base):
         "amount", Numeric(10, 2), nullable=False
     )
     _date_paid_col: Mapped[date] = mapped_column(
-        "date_paid", Date, nullable=False
+        "date_paid", Date, nullable=False, index=True
     )
     _method_col: Mapped[Optional[str]] = mapped_column(
         "method", String(20), nullable=True  # e.g. cash, mpesa, bank
@@ -1,12 +1,15 @@
 # models/property.py
-from sqlalchemy import String, Boolean, Integer
+from sqlalchemy import CheckConstraint, String, Boolean, Integer
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List, Optional
-from models import Base, CRUDMixin, TimestampMixin
+from models import Base, CRUDMixin, TimestampMixin, VersionMixin
 
 
-class Property(CRUDMixin, TimestampMixin, Base):
+class Property(CRUDMixin, TimestampMixin, VersionMixin, Base):
     __tablename__ = "properties"
+    __table_args__ = (
+        CheckConstraint("monthly_rent > 0", name="ck_properties_monthly_rent_positive"),
+    )
 
     # Collision-proof private mapped columns
     _address_col: Mapped[str] = mapped_column(
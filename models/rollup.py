@@ -0,0 +1,37 @@
+# models/rollup.py
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import Date, Index, Integer, Numeric, String
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Optional
+from models import Base
+
+
+class PaymentRollup(Base):
+    """
+    Precomputed payment totals per (grain, bucket, lease, method).
+
+    property_id and property_type are denormalised from the lease so that
+    range queries by any of those dimensions never touch `payments`.
+    """
+    __tablename__ = "payment_rollups"
+    __table_args__ = (
+        Index("ix_payment_rollups_grain_bucket", "grain", "bucket"),
+        Index("ix_payment_rollups_lease", "lease_id"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    grain: Mapped[str] = mapped_column(String(5), nullable=False)  # day, month
+    bucket: Mapped[date] = mapped_column(Date, nullable=False)
+    lease_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    property_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    property_type: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    method: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+    total: Mapped[Decimal] = mapped_column(Numeric(12, 2), nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<PaymentRollup {self.grain} {self.bucket} lease_id={self.lease_id} "
+            f"method='{self.method}' total={self.total} count={self.count}>"
+        )
@@ -2,10 +2,10 @@
 from sqlalchemy import String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import List
-from models import Base, CRUDMixin, TimestampMixin
+from models import Base, CRUDMixin, TimestampMixin, VersionMixin
 
 
-class Tenant(CRUDMixin, TimestampMixin, Base):
+class Tenant(CRUDMixin, TimestampMixin, VersionMixin, Base):
     __tablename__ = "tenants"
 
     # Collision-proof mapped columns
@@ -0,0 +1,38 @@
+# models/watermark.py
+from datetime import date
+from typing import Optional
+from sqlalchemy import Date, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from models import Base
+
+
+class Watermark(Base):
+    """Last change sequence (and, for dated batches, as-of date) processed by a named job."""
+    __tablename__ = "watermarks"
+
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    as_of: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+
+    @classmethod
+    def get(cls, session, name: str) -> int:
+        row = session.get(cls, name)
+        return row.seq if row is not None else 0
+
+    @classmethod
+    def get_as_of(cls, session, name: str) -> Optional[date]:
+        row = session.get(cls, name)
+        return row.as_of if row is not None else None
+
+    @classmethod
+    def set(cls, session, name: str, seq: int, as_of: Optional[date] = None) -> None:
+        row = session.get(cls, name)
+        if row is None:
+            session.add(cls(name=name, seq=seq, as_of=as_of))
+        else:
+            row.seq = seq
+            if as_of is not None:
+                row.as_of = as_of
+
+    def __repr__(self) -> str:
+        return f"<Watermark name='{self.name}' seq={self.seq} as_of={self.as_of}>"
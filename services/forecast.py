@@ -0,0 +1,266 @@
+# services/forecast.py
+"""
+Forward revenue and lease-expiry projection.
+
+`Projection` loads every active lease and every property once, converts
+all dates to integer month offsets from the as-of month, and builds a
+12-36 month schedule:
+
+- a lease contributes its rent every month from its start until its
+  scheduled end. Rent escalates by `escalation_rate` (optionally per
+  property type) on each lease anniversary.
+- open-ended leases are expected to continue, discounted by a monthly
+  `churn_rate`.
+- a property whose lease ends, or that is vacant today, is assumed to be
+  re-let after `vacancy_months` at its current rent, weighted by
+  `relet_rate`.
+
+A later lease on the same property, already signed or added in a scenario,
+replaces the assumed re-let revenue of the earlier terms from its start.
+Per-lease rows are cached for each set of assumptions, so `what_if` only
+recomputes the leases a scenario touches and adjusts the cached totals.
+"""
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from models.lease import Lease
+from models.property import Property
+
+
+@dataclass(frozen=True)
+class Assumptions:
+    escalation_rate: float = 0.0          # annual, applied on lease anniversaries
+    escalation_by_type: Tuple[Tuple[str, float], ...] = ()  # (property_type, rate) overrides
+    churn_rate: float = 0.0               # monthly, open-ended leases only
+    vacancy_months: int = 1               # gap before a freed property is re-let
+    relet_rate: float = 1.0               # share of freed/vacant properties re-let
+
+    def escalation_for(self, property_type: Optional[str]) -> float:
+        return dict(self.escalation_by_type).get(property_type, self.escalation_rate)
+
+
+@dataclass(frozen=True)
+class LeaseChange:
+    """A what-if edit: end a lease early, change its rent, or add a new one."""
+    lease_id: Optional[int] = None        # None adds a new lease
+    property_id: Optional[int] = None
+    start: Optional[date] = None
+    end: Optional[date] = None
+    rent: Optional[int] = None
+
+
+@dataclass
+class Schedule:
+    months: List[date]
+    revenue: List[float]
+    revenue_by_type: Dict[Optional[str], List[float]]
+    expiries: List[int]                   # leases with a scheduled end in the month
+    expiring_rent: List[float]            # contract rent of those leases
+    by_lease: Dict[object, List[float]] = field(default_factory=dict, repr=False)
+
+
+@dataclass
+class _Term:
+    key: object                           # lease id, or ("vacant", property_id) / ("new", n)
+    property_id: int
+    property_type: Optional[str]
+    rent: int
+    start: int                            # absolute month number (year * 12 + month - 1)
+    end: Optional[int]                    # first month not covered, None if open-ended
+    expires: Optional[int] = None         # month of the scheduled end date
+
+
+def _end_month(end: Optional[date]) -> Optional[int]:
+    # A lease ending mid-month is counted for that whole month
+    if end is None:
+        return None
+    return _abs_month(end) + (1 if end.day > 1 else 0)
+
+
+def _abs_month(d: date) -> int:
+    return d.year * 12 + d.month - 1
+
+
+def _month_date(n: int) -> date:
+    return date(n // 12, n % 12 + 1, 1)
+
+
+class Projection:
+    """Portfolio projection from `as_of` for `months` months (12-36)."""
+
+    def __init__(self, session, as_of: date, months: int = 24) -> None:
+        if not 1 <= months <= 36:
+            raise ValueError("months must be between 1 and 36.")
+        self.origin = _abs_month(as_of)
+        self.months = months
+        self.property_types: Dict[int, Optional[str]] = {}
+        self.terms = self._load(session)
+        self._by_property: Dict[int, List[object]] = {}
+        for term in self.terms.values():
+            self._by_property.setdefault(term.property_id, []).append(term.key)
+        self._cuts = self._successor_cuts()
+        self._cache: Dict[Assumptions, Schedule] = {}
+
+    def _load(self, session) -> Dict[object, _Term]:
+        leases = Lease.__table__
+        props = Property.__table__
+        terms: Dict[object, _Term] = {}
+        let = set()
+        stmt = (
+            select(leases.c.id, leases.c.property_id, props.c.property_type,
+                   props.c.monthly_rent, leases.c.start_date, leases.c.end_date)
+            .join(props, props.c.id == leases.c.property_id)
+            .where(leases.c.status == "active")
+        )
+        for lid, pid, ptype, rent, start, end in session.execute(stmt):
+            end_m = _end_month(end)
+            if end_m is not None and end_m <= self.origin:
+                continue
+            terms[lid] = _Term(lid, pid, ptype, rent, _abs_month(start), end_m,
+                               _abs_month(end) if end is not None else None)
+            let.add(pid)
+        for pid, ptype, rent in session.execute(
+            select(props.c.id, props.c.property_type, props.c.monthly_rent)
+        ):
+            self.property_types[pid] = ptype
+            if pid not in let:
+                # Vacant today: modelled as a lease that just ended
+                key = ("vacant", pid)
+                terms[key] = _Term(key, pid, ptype, rent, self.origin, self.origin)
+        return terms
+
+    # ----- Row computation -----
+
+    def _row(self, term: _Term, a: Assumptions) -> List[float]:
+        row = [0.0] * self.months
+        growth = 1.0 + a.escalation_for(term.property_type)
+        for i in range(self.months):
+            m = self.origin + i
+            if m < term.start:
+                continue
+            if term.end is None:
+                years = (m - term.start) // 12
+                row[i] = term.rent * growth ** years * (1.0 - a.churn_rate) ** i
+            elif m < term.end:
+                row[i] = term.rent * growth ** ((m - term.start) // 12)
+            elif m >= term.end + a.vacancy_months:
+                # Re-let at the rent the outgoing lease had reached, escalating
+                # from the new start.
+                last = term.rent * growth ** (max(term.end - 1 - term.start, 0) // 12)
+                relet_start = term.end + a.vacancy_months
+                row[i] = a.relet_rate * last * growth ** ((m - relet_start) // 12)
+        return row
+
+    def _cut_tail(self, term: _Term, row: List[float], from_month: int) -> List[float]:
+        # Drop the vacancy/re-let part of a row (months at or after the
+        # term's end) from `from_month` on; contract rent is kept.
+        if term.end is None:
+            return row
+        first = max(term.end, from_month) - self.origin
+        return row[:max(first, 0)] + [0.0] * (self.months - max(first, 0))
+
+    def _successor_cuts(self) -> Dict[object, int]:
+        # key -> start of the next later-starting term on the same property
+        cuts: Dict[object, int] = {}
+        for keys in self._by_property.values():
+            starts = sorted(self.terms[key].start for key in keys)
+            for key in keys:
+                later = [s for s in starts if s > self.terms[key].start]
+                if later:
+                    cuts[key] = later[0]
+        return cuts
+
+    def _expiry(self, term: _Term) -> Optional[int]:
+        # Month index a lease's scheduled end date falls in
+        if term.expires is None:
+            return None
+        i = term.expires - self.origin
+        return i if 0 <= i < self.months else None
+
+    def _build(self, terms: Iterable[_Term], a: Assumptions) -> Schedule:
+        months = [_month_date(self.origin + i) for i in range(self.months)]
+        sched = Schedule(months, [0.0] * self.months, {}, [0] * self.months, [0.0] * self.months)
+        for term in terms:
+            row = self._row(term, a)
+            if term.key in self._cuts:
+                row = self._cut_tail(term, row, self._cuts[term.key])
+            self._add(sched, term, row, 1)
+        return sched
+
+    def _add(self, sched: Schedule, term: _Term, row: List[float], sign: int) -> None:
+        by_type = sched.revenue_by_type.setdefault(term.property_type, [0.0] * self.months)
+        for i, value in enumerate(row):
+            sched.revenue[i] += sign * value
+            by_type[i] += sign * value
+        if sign > 0:
+            sched.by_lease[term.key] = row
+        else:
+            sched.by_lease.pop(term.key, None)
+        i = self._expiry(term)
+        if i is not None:
+            sched.expiries[i] += sign
+            sched.expiring_rent[i] += sign * term.rent
+
+    # ----- Public API -----
+
+    def schedule(self, assumptions: Assumptions = Assumptions()) -> Schedule:
+        """The base schedule for a set of assumptions (cached)."""
+        if assumptions not in self._cache:
+            self._cache[assumptions] = self._build(self.terms.values(), assumptions)
+        return self._cache[assumptions]
+
+    def what_if(self, changes: Iterable[LeaseChange],
+                assumptions: Assumptions = Assumptions()) -> Schedule:
+        """
+        Apply lease changes on top of the cached base schedule.
+
+        Only the touched leases are recomputed; the base is left untouched.
+        """
+        base = self.schedule(assumptions)
+        sched = Schedule(
+            list(base.months), list(base.revenue),
+            {k: list(v) for k, v in base.revenue_by_type.items()},
+            list(base.expiries), list(base.expiring_rent), dict(base.by_lease),
+        )
+        current: Dict[object, _Term] = {}
+        cuts = dict(self._cuts)           # key -> month the re-let tail was replaced from
+        added = 0
+        for change in changes:
+            if change.lease_id is None:
+                if change.property_id is None or change.start is None or change.rent is None:
+                    raise ValueError("A new lease needs property_id, start and rent.")
+                pid = change.property_id
+                start = _abs_month(change.start)
+                keys = list(self._by_property.get(pid, ()))
+                keys += [k for k, t in current.items() if t.property_id == pid and k not in keys]
+                for key in keys:
+                    other = current.get(key) or self.terms[key]
+                    cuts[key] = min(cuts.get(key, start), start)
+                    row = sched.by_lease[key]
+                    self._add(sched, other, row, -1)
+                    self._add(sched, other, self._cut_tail(other, row, cuts[key]), 1)
+                added += 1
+                term = _Term(("new", added), pid, self.property_types.get(pid), change.rent,
+                             start, _end_month(change.end),
+                             _abs_month(change.end) if change.end else None)
+            else:
+                old = current.get(change.lease_id) or self.terms.get(change.lease_id)
+                if old is None:
+                    raise ValueError(f"Lease {change.lease_id} is not in the projection.")
+                self._add(sched, old, sched.by_lease[old.key], -1)
+                end, expires = old.end, old.expires
+                if change.end is not None:
+                    end, expires = _end_month(change.end), _abs_month(change.end)
+                term = _Term(old.key, old.property_id, old.property_type,
+                             change.rent if change.rent is not None else old.rent,
+                             _abs_month(change.start) if change.start else old.start,
+                             end, expires)
+            current[term.key] = term
+            row = self._row(term, assumptions)
+            if term.key in cuts:
+                row = self._cut_tail(term, row, cuts[term.key])
+            self._add(sched, term, row, 1)
+        return sched
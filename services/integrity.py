@@ -0,0 +1,328 @@
+# services/integrity.py
+"""
+Data-integrity checker.
+
+Re-applies the model validation rules (the Property, Tenant, Lease and
+Payment setters) to rows already in the database as set-based SQL, and
+adds the checks the setters cannot make: orphaned foreign keys,
+overlapping leases on one property, and duplicate addresses/contacts.
+
+Row checks run on primary-key ranges of `chunk` rows, spread over worker
+processes that each open their own connection; every query is a range scan
+on the primary key plus indexed lookups, so large tables stream through
+without being loaded. The result is a JSON report; `--fix` applies the safe
+repairs (trimming whitespace, deleting orphaned rows) and re-checks.
+
+Repairs are set-based (UPDATE/DELETE ... WHERE <check>) over the same
+primary-key ranges, so they cover every failing row, not just the ids
+listed in the report. Deleting a lease whose property is missing also
+deletes its payments, charges and payment rollups. A lease whose tenant is
+missing is only reported: it still has a property, rent and payments.
+Trimming an address or contact that would collide with another row's is
+skipped, and the row stays flagged (the duplicate checks report it too).
+Each repair appends change records in its own transaction, so incremental
+jobs (timeseries, late fees) pick it up like any other write.
+
+    python -m services.integrity [--fix] [--workers N] [--chunk N] [--report out.json]
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, create_engine, delete, func, literal, or_, select, update
+from sqlalchemy.orm import aliased
+
+from db.cdc import TRACKED_MODELS, record_changes
+from models.charge import Charge
+from models.lease import Lease
+from models.payment import Payment
+from models.property import Property
+from models.rollup import PaymentRollup
+from models.tenant import Tenant
+
+MAX_IDS = 1000  # row ids listed per issue; `count` is always exact, fixes cover every row
+
+properties = Property.__table__
+tenants = Tenant.__table__
+leases = Lease.__table__
+payments = Payment.__table__
+charges = Charge.__table__
+rollups = PaymentRollup.__table__
+_TRACKED = {model.__table__.name for model in TRACKED_MODELS}
+
+
+def _short(column, minimum: int):
+    return func.length(func.trim(column)) < minimum
+
+
+def _untrimmed(column):
+    return column != func.trim(column)
+
+
+@dataclass(frozen=True)
+class Check:
+    name: str
+    table: Any
+    severity: str                                  # error, warning
+    where: Callable[[], Any]                       # condition on `table` rows
+    fix: Optional[Callable[[Any, Any], int]] = None  # (connection, condition) -> rows changed
+    fix_only: Optional[Callable[[], Any]] = None   # narrower condition for rows the fix may change
+
+
+def _orphan(child, fk, parent):
+    return lambda: ~select(parent.c.id).where(parent.c.id == child.c[fk]).exists()
+
+
+def _trim(table, column):
+    # Bump the version too, so ORM sessions holding the old row get a
+    # StaleDataError instead of writing the untrimmed value back.
+    def apply(conn, where) -> int:
+        rows = conn.execute(select(table.c.id, table.c[column], table.c.version).where(where)).all()
+        record_changes(conn, table.name, "update", (
+            (row_id, {column: [value, value.strip(" ")], "version": [version, version + 1]})
+            for row_id, value, version in rows
+        ))
+        return conn.execute(update(table).where(where).values(
+            {column: func.trim(table.c[column]), "version": table.c.version + 1}
+        )).rowcount
+    return apply
+
+
+def _trim_unclaimed(table, column):
+    # Rows whose trimmed value no other row has, trimmed or not; trimming
+    # the others would violate the column's unique constraint.
+    other = table.alias("other")
+    return lambda: ~select(other.c.id).where(
+        other.c.id != table.c.id, func.trim(other.c[column]) == func.trim(table.c[column])
+    ).exists()
+
+
+def _delete(table):
+    def apply(conn, where) -> int:
+        if table.name in _TRACKED:
+            rows = conn.execute(select(table).where(where)).mappings().all()
+            record_changes(conn, table.name, "delete", (
+                (row["id"], {name: [value, None] for name, value in row.items()}) for row in rows
+            ))
+        return conn.execute(delete(table).where(where)).rowcount
+    return apply
+
+
+ROW_CHECKS: Tuple[Check, ...] = (
+    Check("property_address_too_short", properties, "error",
+          lambda: or_(properties.c.address.is_(None), _short(properties.c.address, 5))),
+    Check("property_address_untrimmed", properties, "warning",
+          lambda: _untrimmed(properties.c.address), _trim(properties, "address"),
+          _trim_unclaimed(properties, "address")),
+    Check("property_rent_not_positive", properties, "error",
+          lambda: or_(properties.c.monthly_rent.is_(None), properties.c.monthly_rent <= 0)),
+    Check("property_type_too_short", properties, "error",
+          lambda: and_(properties.c.property_type.is_not(None), _short(properties.c.property_type, 3))),
+    Check("tenant_name_too_short", tenants, "error",
+          lambda: or_(tenants.c.name.is_(None), _short(tenants.c.name, 2))),
+    Check("tenant_name_untrimmed", tenants, "warning",
+          lambda: _untrimmed(tenants.c.name), _trim(tenants, "name")),
+    Check("tenant_contact_too_short", tenants, "error",
+          lambda: or_(tenants.c.contact_info.is_(None), _short(tenants.c.contact_info, 7))),
+    Check("tenant_contact_untrimmed", tenants, "warning",
+          lambda: _untrimmed(tenants.c.contact_info), _trim(tenants, "contact_info"),
+          _trim_unclaimed(tenants, "contact_info")),
+    Check("lease_end_not_after_start", leases, "error",
+          lambda: and_(leases.c.end_date.is_not(None), leases.c.end_date <= leases.c.start_date)),
+    Check("lease_status_invalid", leases, "error",
+          lambda: leases.c.status.not_in(("active", "ended"))),
+    Check("lease_ended_without_end_date", leases, "warning",
+          lambda: and_(leases.c.status == "ended", leases.c.end_date.is_(None))),
+    Check("lease_orphan_property", leases, "error",
+          _orphan(leases, "property_id", properties), _delete(leases)),
+    Check("lease_orphan_tenant", leases, "error",
+          _orphan(leases, "tenant_id", tenants)),
+    Check("payment_amount_not_positive", payments, "error",
+          lambda: or_(payments.c.amount.is_(None), payments.c.amount <= 0)),
+    Check("payment_method_too_short", payments, "error",
+          lambda: and_(payments.c.method.is_not(None), _short(payments.c.method, 3))),
+    Check("payment_method_untrimmed", payments, "warning",
+          lambda: _untrimmed(payments.c.method), _trim(payments, "method")),
+    Check("payment_orphan_lease", payments, "error",
+          _orphan(payments, "lease_id", leases), _delete(payments)),
+    Check("payment_before_lease_start", payments, "warning",
+          lambda: select(leases.c.id).where(
+              leases.c.id == payments.c.lease_id, payments.c.date_paid < leases.c.start_date
+          ).exists()),
+    Check("charge_orphan_lease", charges, "error",
+          _orphan(charges, "lease_id", leases), _delete(charges)),
+)
+
+
+def _overlapping_leases():
+    # Leases on the same property whose date ranges intersect; the row
+    # reported is the later lease of each pair. Uses ix_leases_property_id.
+    a = aliased(leases, name="a")
+    far = literal(date(9999, 12, 31))
+    stmt = select(leases.c.id).where(select(a.c.id).where(
+        a.c.property_id == leases.c.property_id,
+        a.c.id < leases.c.id,
+        a.c.start_date < func.coalesce(leases.c.end_date, far),
+        leases.c.start_date < func.coalesce(a.c.end_date, far),
+    ).exists())
+    return leases, stmt, leases.c.id
+
+
+def _duplicates(table, column):
+    # Every row after the first with the same normalised value, in one
+    # sorted pass (window function) rather than a self-join.
+    norm = func.lower(func.trim(table.c[column]))
+    ranked = select(
+        table.c.id,
+        func.row_number().over(partition_by=norm, order_by=table.c.id).label("rn"),
+    ).subquery()
+    return table, select(ranked.c.id).where(ranked.c.rn > 1), ranked.c.id
+
+
+# name -> (severity, builder, chunked). Unchunked checks need the whole
+# table at once and run as a single task alongside the chunked ones.
+SET_CHECKS: Dict[str, Tuple[str, Callable[[], Tuple[Any, Any, Any]], bool]] = {
+    "lease_overlap": ("error", _overlapping_leases, True),
+    "property_duplicate_address": ("error", lambda: _duplicates(properties, "address"), False),
+    "tenant_duplicate_contact": ("error", lambda: _duplicates(tenants, "contact_info"), False),
+}
+
+_CHECKS_BY_NAME = {c.name: c for c in ROW_CHECKS}
+_engine = None
+
+
+def _worker_engine(url: str):
+    global _engine
+    if _engine is None:
+        _engine = create_engine(url)
+    return _engine
+
+
+def _run_chunk(url: str, name: str, lo: Optional[int], hi: Optional[int]) -> Tuple[str, List[int]]:
+    """Worker: ids in [lo, hi) failing one check (the whole table if lo is None)."""
+    if name in _CHECKS_BY_NAME:
+        c = _CHECKS_BY_NAME[name]
+        table, id_col = c.table, c.table.c.id
+        stmt = select(table.c.id).where(c.where())
+    else:
+        table, stmt, id_col = SET_CHECKS[name][1]()
+    if lo is not None:
+        stmt = stmt.where(table.c.id >= lo, table.c.id < hi)
+    with _worker_engine(url).connect() as conn:
+        return name, list(conn.scalars(stmt.order_by(id_col)))
+
+
+def _ranges(conn, table, chunk: int) -> List[Tuple[int, int]]:
+    lo, hi = conn.execute(select(func.min(table.c.id), func.max(table.c.id))).one()
+    if lo is None:
+        return []
+    return [(start, min(start + chunk, hi + 1)) for start in range(lo, hi + 1, chunk)]
+
+
+def check(url: str, workers: Optional[int] = None, chunk: int = 50_000) -> Dict[str, Any]:
+    """Run every check against the database at `url` and return the report."""
+    engine = create_engine(url)
+    tables = {t.name: t for t in (properties, tenants, leases, payments, charges)}
+    with engine.connect() as conn:
+        counts = {name: conn.scalar(select(func.count()).select_from(t)) for name, t in tables.items()}
+        ranges = {name: _ranges(conn, t, chunk) for name, t in tables.items()}
+    engine.dispose()
+
+    tasks = [(c.name, lo, hi) for c in ROW_CHECKS for lo, hi in ranges[c.table.name]]
+    for name, (_, build, chunked) in SET_CHECKS.items():
+        table = build()[0]
+        if chunked:
+            tasks += [(name, lo, hi) for lo, hi in ranges[table.name]]
+        elif counts[table.name]:
+            tasks.append((name, None, None))
+
+    found: Dict[str, List[int]] = {}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_run_chunk, url, *task) for task in tasks]
+        for future in futures:
+            name, ids = future.result()
+            found.setdefault(name, []).extend(ids)
+
+    issues = []
+    for c in ROW_CHECKS:
+        ids = sorted(found.get(c.name, []))
+        if ids:
+            issues.append({"check": c.name, "table": c.table.name, "severity": c.severity,
+                           "count": len(ids), "fixable": c.fix is not None, "row_ids": ids[:MAX_IDS]})
+    for name, (severity, build, _) in SET_CHECKS.items():
+        ids = sorted(found.get(name, []))
+        if ids:
+            issues.append({"check": name, "table": build()[0].name, "severity": severity,
+                           "count": len(ids), "fixable": False, "row_ids": ids[:MAX_IDS]})
+    return {
+        "checked_at": datetime.now().isoformat(timespec="seconds"),
+        "rows": counts,
+        "issues": issues,
+    }
+
+
+def fix(url: str, report: Dict[str, Any], chunk: int = 50_000) -> Dict[str, int]:
+    """
+    Apply the safe repairs for the fixable checks that failed in `report`.
+
+    Each repair is one UPDATE/DELETE per primary-key range, filtered by the
+    check's own condition, so rows beyond the ids listed in the report are
+    repaired too. Orphaned leases take their payments, charges and payment
+    rollups with them. Change records for tracked tables are written in the
+    same transaction. Returns {check: rows changed}.
+    """
+    engine = create_engine(url)
+    applied: Dict[str, int] = {}
+    failing = {issue["check"] for issue in report["issues"]}
+    for c in ROW_CHECKS:
+        if c.fix is None or c.name not in failing:
+            continue
+        with engine.connect() as conn:
+            ranges = _ranges(conn, c.table, chunk)
+        applied[c.name] = 0
+        for lo, hi in ranges:
+            where = and_(c.where(), c.table.c.id >= lo, c.table.c.id < hi)
+            if c.fix_only is not None:
+                where = and_(where, c.fix_only())
+            with engine.begin() as conn:
+                if c.table is leases:
+                    doomed = select(leases.c.id).where(where)
+                    for child in (payments, charges, rollups):
+                        _delete(child)(conn, child.c.lease_id.in_(doomed))
+                applied[c.name] += c.fix(conn, where)
+    engine.dispose()
+    return applied
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m services.integrity")
+    parser.add_argument("--url", default=os.getenv("RENTWISE_DB_URL", "sqlite:///dev.db"))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=50_000, help="rows per worker task")
+    parser.add_argument("--report", help="write the JSON report here instead of stdout")
+    parser.add_argument("--fix", action="store_true", help="apply safe repairs, then re-check")
+    args = parser.parse_args(argv)
+
+    report = check(args.url, args.workers, args.chunk)
+    if args.fix and any(i["fixable"] for i in report["issues"]):
+        fixed = fix(args.url, report, args.chunk)
+        report = check(args.url, args.workers, args.chunk)
+        report["fixed"] = fixed
+
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text)
+        print(f"{len(report['issues'])} issue(s); report written to {args.report}")
+    else:
+        print(text)
+    sys.exit(1 if any(i["severity"] == "error" for i in report["issues"]) else 0)
+
+
+if __name__ == "__main__":
+    main()
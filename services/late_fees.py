@@ -0,0 +1,328 @@
+# services/late_fees.py
+"""
+Nightly late-fee batch.
+
+Rent for a lease falls due every month on the lease's start day (clamped to
+the end of shorter months). A period is late when, `grace_days` after its
+due date, payments received so far do not cover the rent due through that
+period. The fee is `flat_fee` plus `percent` of the late base, limited to
+`cap`. Without compounding the base is the unpaid rent of that period. With
+compounding it is the whole outstanding balance, including earlier unpaid
+fees.
+
+`run` evaluates leases in one batched pass: a handful of set-based queries
+load leases, payments and existing fees, then each lease is settled with a
+single merge over its sorted due dates and payments. Charges are written
+idempotently (keyed by lease, kind and period). Incremental runs only touch
+leases whose payments, lease terms or property rent changed since the last
+run (via the change stream), plus leases with a period that became
+assessable since the previous as-of date.
+
+Ended leases are evaluated up to their end date, so a late payment on an
+ended lease still clears its fee. A lease marked ended without an end date
+is only re-evaluated up to its last charged period. A run with an as-of
+date before the previous run's re-evaluates every lease, which removes
+fees for periods not yet assessable at that date.
+
+    python -m services.late_fees --as-of 2025-01-31 [--rules rules.json] [--full]
+"""
+import argparse
+import calendar
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import and_, bindparam, delete, func, insert, or_, select, update
+
+from db.cdc import latest_seq, tail_changes
+from models.charge import Charge
+from models.lease import Lease
+from models.payment import Payment
+from models.property import Property
+from models.watermark import Watermark
+
+KIND = "late_fee"
+WATERMARK = "late_fees"  # seq: last change processed; as_of: last as-of date
+_CHUNK = 500
+_CENT = Decimal("0.01")
+
+
+@dataclass(frozen=True)
+class PenaltyRules:
+    grace_days: int = 5
+    flat_fee: Decimal = Decimal("0")
+    percent: Decimal = Decimal("0")   # e.g. Decimal("0.05") for 5%
+    cap: Optional[Decimal] = None     # maximum fee per period
+    compounding: bool = False
+
+    def __post_init__(self) -> None:
+        if self.grace_days < 0:
+            raise ValueError("grace_days must not be negative.")
+        if self.flat_fee < 0 or self.percent < 0:
+            raise ValueError("flat_fee and percent must not be negative.")
+        if self.cap is not None and self.cap < 0:
+            raise ValueError("cap must not be negative.")
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "PenaltyRules":
+        return cls(
+            grace_days=int(data.get("grace_days", 5)),
+            flat_fee=Decimal(str(data.get("flat_fee", 0))),
+            percent=Decimal(str(data.get("percent", 0))),
+            cap=Decimal(str(data["cap"])) if data.get("cap") is not None else None,
+            compounding=bool(data.get("compounding", False)),
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "PenaltyRules":
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def fee(self, base: Decimal) -> Decimal:
+        amount = self.flat_fee + self.percent * base
+        if self.cap is not None:
+            amount = min(amount, self.cap)
+        return amount.quantize(_CENT, rounding=ROUND_HALF_UP)
+
+
+def due_date(start: date, k: int) -> date:
+    """The k-th monthly due date of a lease starting on `start`."""
+    month = start.month - 1 + k
+    year, month = start.year + month // 12, month % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def periods(start: date, end: Optional[date], last_due: date) -> Iterable[date]:
+    """Due dates of a lease up to and including `last_due`, before its `end`."""
+    k = 0
+    while True:
+        due = due_date(start, k)
+        if due > last_due or (end is not None and due >= end):
+            return
+        yield due
+        k += 1
+
+
+def assess_lease(start: date, end: Optional[date], rent: Decimal,
+                 payments: Sequence[Tuple[date, Decimal]], rules: PenaltyRules,
+                 as_of: date) -> Dict[date, Decimal]:
+    """
+    Return {due date: fee} for one lease as of `as_of`.
+
+    `payments` must be sorted by date. Due dates and payment dates are
+    merged in one pass, so the cost is linear in periods plus payments.
+    """
+    grace = timedelta(days=rules.grace_days)
+    fees: Dict[date, Decimal] = {}
+    rent_due = Decimal("0")
+    fees_due = Decimal("0")
+    paid = Decimal("0")
+    i = 0
+    for due in periods(start, end, as_of - grace):
+        rent_due += rent
+        assessed = due + grace
+        while i < len(payments) and payments[i][0] <= assessed:
+            paid += payments[i][1]
+            i += 1
+        if rules.compounding:
+            base = rent_due + fees_due - paid
+        else:
+            base = min(rent, rent_due - paid)
+        if base > 0:
+            fee = rules.fee(base)
+            if fee > 0:
+                fees[due] = fee
+                fees_due += fee
+    return fees
+
+
+# ----- Batch -----
+
+def _chunks(ids: Sequence[int]) -> Iterable[Sequence[int]]:
+    for i in range(0, len(ids), _CHUNK):
+        yield ids[i:i + _CHUNK]
+
+
+def _leases(session) -> List[Tuple[int, date, Optional[date], Decimal]]:
+    # Active leases, ended leases (up to their end date), and leases ended
+    # without an end date that carry fees; those are capped at their last
+    # charged period so nothing new accrues.
+    leases = Lease.__table__
+    props = Property.__table__
+    charges = Charge.__table__
+    last_fee = (
+        select(charges.c.lease_id, func.max(charges.c.period).label("period"))
+        .where(charges.c.kind == KIND)
+        .group_by(charges.c.lease_id)
+        .subquery()
+    )
+    stmt = (
+        select(leases.c.id, leases.c.start_date, leases.c.end_date, leases.c.status,
+               props.c.monthly_rent, last_fee.c.period)
+        .join(props, props.c.id == leases.c.property_id)
+        .outerjoin(last_fee, last_fee.c.lease_id == leases.c.id)
+        .where(or_(leases.c.status == "active", leases.c.end_date.is_not(None),
+                   last_fee.c.period.is_not(None)))
+    )
+    out = []
+    for lid, start, end, status, rent, last in session.execute(stmt):
+        if status != "active" and end is None:
+            end = last + timedelta(days=1)
+        out.append((lid, start, end, Decimal(rent)))
+    return out
+
+
+def _changed_leases(session, after_seq: int, upto_seq: int) -> Set[int]:
+    # Payments and lease terms change a lease directly; a rent change on a
+    # property changes every lease on it.
+    lease_ids: Set[int] = set()
+    payment_ids: Set[int] = set()
+    property_ids: Set[int] = set()
+    for batch in tail_changes(session, after_seq):
+        for change in batch:
+            if change.seq > upto_seq:
+                return lease_ids | _related_leases(session, payment_ids, property_ids)
+            diff = change.diff
+            if change.table_name == "payments":
+                lease_ids.update(v for v in diff.get("lease_id", []) if v is not None)
+                if change.op == "update":
+                    payment_ids.add(change.row_id)
+            elif change.table_name == "leases":
+                lease_ids.add(change.row_id)
+            elif change.table_name == "properties" and "monthly_rent" in diff:
+                property_ids.add(change.row_id)
+    return lease_ids | _related_leases(session, payment_ids, property_ids)
+
+
+def _related_leases(session, payment_ids: Set[int], property_ids: Set[int]) -> Set[int]:
+    payments = Payment.__table__
+    leases = Lease.__table__
+    found: Set[int] = set()
+    for scope in _chunks(sorted(payment_ids)):
+        found.update(session.scalars(select(payments.c.lease_id).where(payments.c.id.in_(scope))))
+    for scope in _chunks(sorted(property_ids)):
+        found.update(session.scalars(select(leases.c.id).where(leases.c.property_id.in_(scope))))
+    return found
+
+
+def _newly_assessable(start: date, end: Optional[date], since: date, as_of: date,
+                      grace: timedelta) -> bool:
+    # Any due date with since < due + grace <= as_of?
+    for due in periods(start, end, as_of - grace):
+        if due + grace > since:
+            return True
+    return False
+
+
+def run(session, as_of: date, rules: PenaltyRules, full: bool = False) -> Dict[str, int]:
+    """
+    Assess late fees as of `as_of`, write them and commit.
+
+    Returns counts of leases evaluated and charges inserted/updated/deleted.
+    """
+    target = latest_seq(session)
+    watermark = Watermark.get(session, WATERMARK)
+    last_as_of = Watermark.get_as_of(session, WATERMARK)
+    candidates = _leases(session)
+    grace = timedelta(days=rules.grace_days)
+
+    if full or watermark == 0 or last_as_of is None or as_of < last_as_of:
+        selected = candidates
+    else:
+        changed = _changed_leases(session, watermark, target)
+        selected = [
+            row for row in candidates
+            if row[0] in changed or _newly_assessable(row[1], row[2], last_as_of, as_of, grace)
+        ]
+
+    counts = {"leases": len(selected), "inserted": 0, "updated": 0, "deleted": 0}
+    payments = Payment.__table__
+    charges = Charge.__table__
+    by_id = {row[0]: row for row in selected}
+
+    for scope in _chunks(sorted(by_id)):
+        paid: Dict[int, List[Tuple[date, Decimal]]] = {lid: [] for lid in scope}
+        stmt = (
+            select(payments.c.lease_id, payments.c.date_paid, payments.c.amount)
+            .where(payments.c.lease_id.in_(scope))
+            .order_by(payments.c.lease_id, payments.c.date_paid)
+        )
+        for lid, when, amount in session.execute(stmt):
+            paid[lid].append((when, Decimal(amount)))
+
+        existing: Dict[Tuple[int, date], Decimal] = {}
+        stmt = select(charges.c.lease_id, charges.c.period, charges.c.amount).where(
+            charges.c.kind == KIND, charges.c.lease_id.in_(scope)
+        )
+        for lid, period, amount in session.execute(stmt):
+            existing[(lid, period)] = Decimal(amount)
+
+        wanted: Dict[Tuple[int, date], Decimal] = {}
+        for lid in scope:
+            _, start, end, rent = by_id[lid]
+            for period, fee in assess_lease(start, end, rent, paid[lid], rules, as_of).items():
+                wanted[(lid, period)] = fee
+
+        to_insert = [
+            {"lease_id": lid, "kind": KIND, "period": period, "amount": fee, "assessed_on": as_of}
+            for (lid, period), fee in wanted.items() if (lid, period) not in existing
+        ]
+        to_update = [
+            {"b_lease_id": lid, "b_period": period, "amount": fee, "assessed_on": as_of}
+            for (lid, period), fee in wanted.items()
+            if (lid, period) in existing and existing[(lid, period)] != fee
+        ]
+        to_delete = [
+            {"b_lease_id": lid, "b_period": period}
+            for (lid, period) in existing if (lid, period) not in wanted
+        ]
+        if to_insert:
+            session.execute(insert(charges), to_insert)
+        if to_update:
+            session.execute(
+                update(charges)
+                .where(and_(charges.c.lease_id == bindparam("b_lease_id"),
+                            charges.c.kind == KIND,
+                            charges.c.period == bindparam("b_period")))
+                .values(amount=bindparam("amount"), assessed_on=bindparam("assessed_on")),
+                to_update,
+            )
+        if to_delete:
+            session.execute(
+                delete(charges).where(and_(charges.c.lease_id == bindparam("b_lease_id"),
+                                           charges.c.kind == KIND,
+                                           charges.c.period == bindparam("b_period"))),
+                to_delete,
+            )
+        counts["inserted"] += len(to_insert)
+        counts["updated"] += len(to_update)
+        counts["deleted"] += len(to_delete)
+
+    Watermark.set(session, WATERMARK, target, as_of)
+    session.commit()
+    return counts
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m services.late_fees")
+    parser.add_argument("--as-of", default=date.today().isoformat(), help="YYYY-MM-DD")
+    parser.add_argument("--rules", help="JSON file with grace_days, flat_fee, percent, cap, compounding")
+    parser.add_argument("--full", action="store_true", help="re-evaluate every active lease (e.g. after changing rules)")
+    args = parser.parse_args(argv)
+
+    from init_db import SessionLocal
+    as_of = datetime.strptime(args.as_of, "%Y-%m-%d").date()
+    rules = PenaltyRules.from_file(args.rules) if args.rules else PenaltyRules()
+    session = SessionLocal()
+    try:
+        counts = run(session, as_of, rules, full=args.full)
+    finally:
+        session.close()
+    print(f"Late fees as of {as_of}: {counts['leases']} leases evaluated, "
+          f"{counts['inserted']} charged, {counts['updated']} updated, {counts['deleted']} cleared.")
+
+
+if __name__ == "__main__":
+    main()
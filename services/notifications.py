@@ -0,0 +1,379 @@
+# services/notifications.py
+"""
+Rent reminder pipeline: select, enqueue, dispatch.
+
+`enqueue_reminders` finds tenants whose rent is due within `days_ahead`
+days or who are behind on rent, using one query over active leases plus
+one grouped query on payments (ix_payments_lease_id). It writes one outbox
+row per reminder, keyed by a dedup key (kind, lease, due date) so repeated
+runs never queue a reminder twice. For overdue reminders the due date is
+the oldest unpaid one, so a tenant is reminded again only once that
+period is settled and a later one is still open.
+
+`Dispatcher` drains the outbox with asyncio workers under a concurrency
+limit and a token-bucket rate limit. Failed sends are retried with
+exponential backoff up to `max_attempts`. A dispatcher claims rows with
+one conditional UPDATE ... RETURNING that pushes `next_attempt_at`
+forward, and delivers only the rows that update matched. Two dispatchers
+therefore never claim the same due row, and a crashed dispatcher's claims
+become due again (at-least-once delivery). Transports are pluggable. SMTP and an
+HTTP SMS gateway are provided; point them at a local stand-in such as
+`python -m aiosmtpd -n -l localhost:1025` for testing.
+
+    python -m services.notifications enqueue [--days-ahead 3] [--as-of D]
+    python -m services.notifications dispatch [--concurrency 10] [--rate 20] \
+        [--smtp localhost:1025] [--sms-url http://localhost:8080/sms]
+"""
+import argparse
+import asyncio
+import json
+import smtplib
+import time
+import urllib.request
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from email.message import EmailMessage
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from models.lease import Lease
+from models.outbox import OutboxMessage
+from models.payment import Payment
+from models.property import Property
+from models.tenant import Tenant
+from services.late_fees import due_date, periods
+
+_CHUNK = 500
+
+
+# ----- Selection and enqueue -----
+
+def channel_for(contact: str) -> str:
+    return "email" if "@" in contact else "sms"
+
+
+def _next_due(start: date, end: Optional[date], on_or_after: date) -> Optional[date]:
+    k = max(0, (on_or_after.year - start.year) * 12 + on_or_after.month - start.month - 1)
+    while True:
+        due = due_date(start, k)
+        if end is not None and due >= end:
+            return None
+        if due >= on_or_after:
+            return due
+        k += 1
+
+
+def select_reminders(session, as_of: date, days_ahead: int = 3) -> List[Dict[str, Any]]:
+    """Return upcoming and overdue reminders as outbox row dicts."""
+    leases = Lease.__table__
+    props = Property.__table__
+    tenants = Tenant.__table__
+    payments = Payment.__table__
+
+    paid = (
+        select(payments.c.lease_id, func.sum(payments.c.amount).label("paid"))
+        .where(payments.c.date_paid <= as_of)
+        .group_by(payments.c.lease_id)
+        .subquery()
+    )
+    stmt = (
+        select(leases.c.id, leases.c.start_date, leases.c.end_date, props.c.address,
+               props.c.monthly_rent, tenants.c.id, tenants.c.name, tenants.c.contact_info,
+               func.coalesce(paid.c.paid, 0))
+        .join(props, props.c.id == leases.c.property_id)
+        .join(tenants, tenants.c.id == leases.c.tenant_id)
+        .outerjoin(paid, paid.c.lease_id == leases.c.id)
+        .where(leases.c.status == "active", leases.c.start_date <= as_of + timedelta(days=days_ahead))
+    )
+
+    now = datetime.now()
+    out = []
+    for lid, start, end, address, rent, tid, name, contact, total_paid in session.execute(stmt):
+        base = {"tenant_id": tid, "channel": channel_for(contact), "recipient": contact,
+                "status": "pending", "attempts": 0, "created_at": now, "next_attempt_at": now}
+        dues = sum(1 for _ in periods(start, end, as_of))
+        arrears = Decimal(rent) * dues - Decimal(total_paid)
+        if arrears > 0:
+            # Payments settle the oldest periods first
+            oldest = due_date(start, int(Decimal(total_paid) // Decimal(rent)))
+            out.append({**base,
+                        "dedup_key": f"overdue:{lid}:{oldest.isoformat()}",
+                        "subject": f"Overdue rent for {address}",
+                        "body": (f"Dear {name}, our records show {arrears:.2f} outstanding on "
+                                 f"{address} as of {as_of}, unpaid since {oldest}. "
+                                 f"Please pay at your earliest convenience.")})
+        due = _next_due(start, end, as_of + timedelta(days=1))
+        if due is not None and due <= as_of + timedelta(days=days_ahead):
+            out.append({**base,
+                        "dedup_key": f"upcoming:{lid}:{due.isoformat()}",
+                        "subject": f"Rent due {due} for {address}",
+                        "body": f"Dear {name}, your rent of {rent} for {address} is due on {due}."})
+    return out
+
+
+def enqueue_reminders(session, as_of: date, days_ahead: int = 3) -> int:
+    """Queue reminders not already in the outbox; commit and return how many."""
+    rows = select_reminders(session, as_of, days_ahead)
+    outbox = OutboxMessage.__table__
+    queued = 0
+    for i in range(0, len(rows), _CHUNK):
+        chunk = rows[i:i + _CHUNK]
+        existing = set(session.scalars(
+            select(outbox.c.dedup_key).where(outbox.c.dedup_key.in_([r["dedup_key"] for r in chunk]))
+        ))
+        fresh = [r for r in chunk if r["dedup_key"] not in existing]
+        if fresh:
+            session.execute(insert(outbox), fresh)
+            queued += len(fresh)
+    session.commit()
+    return queued
+
+
+# ----- Transports -----
+
+class SmtpTransport:
+    """Send email through an SMTP server (blocking smtplib, run in a thread)."""
+
+    def __init__(self, host: str = "localhost", port: int = 1025,
+                 sender: str = "rentwise@localhost") -> None:
+        self.host, self.port, self.sender = host, port, sender
+
+    def _send(self, msg: Dict[str, Any]) -> None:
+        email = EmailMessage()
+        email["From"] = self.sender
+        email["To"] = msg["recipient"]
+        email["Subject"] = msg["subject"]
+        email["Message-ID"] = f"<{msg['dedup_key'].replace(':', '.')}@rentwise>"
+        email.set_content(msg["body"])
+        with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+            smtp.send_message(email)
+
+    async def send(self, msg: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._send, msg)
+
+
+class HttpSmsTransport:
+    """POST {to, body, id} as JSON to an SMS gateway (or a local stand-in)."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+
+    def _send(self, msg: Dict[str, Any]) -> None:
+        data = json.dumps({"to": msg["recipient"], "body": msg["body"], "id": msg["dedup_key"]}).encode()
+        request = urllib.request.Request(self.url, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"SMS gateway returned {response.status}")
+
+    async def send(self, msg: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._send, msg)
+
+
+class MemoryTransport:
+    """Local stand-in: records messages, optionally failing or adding latency."""
+
+    def __init__(self, latency: float = 0.0, fail_every: int = 0) -> None:
+        self.latency = latency
+        self.fail_every = fail_every
+        self.calls = 0
+        self.sent: List[Dict[str, Any]] = []
+
+    async def send(self, msg: Dict[str, Any]) -> None:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_every and self.calls % self.fail_every == 0:
+            raise RuntimeError("simulated delivery failure")
+        self.sent.append(msg)
+
+
+# ----- Dispatch -----
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, bursting to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None) -> None:
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class Dispatcher:
+    """Drain the outbox through transports with bounded concurrency and rate."""
+
+    def __init__(self, session_factory, transports: Dict[str, Any], concurrency: int = 10,
+                 rate: float = 20.0, max_attempts: int = 5, base_backoff: float = 30.0,
+                 claim_timeout: float = 300.0, batch_size: int = 100) -> None:
+        self.session_factory = session_factory
+        self.transports = transports
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.claim_timeout = claim_timeout
+        self.batch_size = batch_size
+        self.metrics: Dict[str, Any] = {"sent": 0, "retried": 0, "failed": 0,
+                                        "send_latency": [], "delivery_latency": []}
+
+    # Database work is synchronous; it runs in a thread off the event loop.
+
+    def _claim(self) -> List[Dict[str, Any]]:
+        # The due-ness guard is repeated on the UPDATE itself: a row another
+        # dispatcher claimed in the meantime no longer matches, so it is not
+        # returned here. SKIP LOCKED (PostgreSQL only) keeps concurrent
+        # claimers from queueing on each other's rows.
+        outbox = OutboxMessage.__table__
+        now = datetime.now()
+        due = (outbox.c.status.in_(("pending", "sending")), outbox.c.next_attempt_at <= now)
+        candidates = (
+            select(outbox.c.id).where(*due)
+            .order_by(outbox.c.next_attempt_at)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        with self.session_factory() as session:
+            rows = session.execute(
+                update(outbox)
+                .where(outbox.c.id.in_(candidates.scalar_subquery()), *due)
+                .values(status="sending", next_attempt_at=now + timedelta(seconds=self.claim_timeout))
+                .returning(outbox.c.id, outbox.c.dedup_key, outbox.c.channel, outbox.c.recipient,
+                           outbox.c.subject, outbox.c.body, outbox.c.attempts, outbox.c.created_at,
+                           outbox.c.next_attempt_at.label("claimed_until"))
+            ).mappings().all()
+            session.commit()
+            return [dict(r) for r in rows]
+
+    def _record(self, results: List[Dict[str, Any]]) -> None:
+        # One executemany per outcome shape (sent / retry / failed)
+        outbox = OutboxMessage.__table__
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for r in results:
+            groups.setdefault(tuple(sorted(r["values"])), []).append(
+                {"b_id": r["id"], "b_claimed_until": r["claimed_until"], **r["values"]}
+            )
+        # Matching on the claim's expiry skips rows whose claim lapsed and
+        # was taken over by another dispatcher.
+        with self.session_factory() as session:
+            for keys, params in groups.items():
+                session.execute(
+                    update(outbox).where(outbox.c.id == bindparam("b_id"),
+                                         outbox.c.next_attempt_at == bindparam("b_claimed_until"))
+                    .values({k: bindparam(k) for k in keys}),
+                    params,
+                )
+            session.commit()
+
+    async def _deliver(self, msg: Dict[str, Any]) -> Dict[str, Any]:
+        transport = self.transports.get(msg["channel"])
+        attempts = msg["attempts"] + 1
+        try:
+            if transport is None:
+                raise RuntimeError(f"No transport for channel '{msg['channel']}'")
+            await self.limiter.acquire()
+            started = time.monotonic()
+            await transport.send(msg)
+        except Exception as exc:
+            if attempts >= self.max_attempts:
+                self.metrics["failed"] += 1
+                values = {"status": "failed", "attempts": attempts, "last_error": str(exc)}
+            else:
+                self.metrics["retried"] += 1
+                delay = self.base_backoff * 2 ** (attempts - 1)
+                values = {"status": "pending", "attempts": attempts, "last_error": str(exc),
+                          "next_attempt_at": datetime.now() + timedelta(seconds=delay)}
+            return {"id": msg["id"], "claimed_until": msg["claimed_until"], "values": values}
+        sent_at = datetime.now()
+        self.metrics["sent"] += 1
+        self.metrics["send_latency"].append(time.monotonic() - started)
+        self.metrics["delivery_latency"].append((sent_at - msg["created_at"]).total_seconds())
+        return {"id": msg["id"], "claimed_until": msg["claimed_until"],
+                "values": {"status": "sent", "attempts": attempts, "sent_at": sent_at}}
+
+    async def run(self, until_empty: bool = True, poll_interval: float = 5.0) -> Dict[str, Any]:
+        """Dispatch due messages; return metrics once the outbox is drained."""
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(msg):
+            async with semaphore:
+                return await self._deliver(msg)
+
+        while True:
+            batch = await asyncio.to_thread(self._claim)
+            if not batch:
+                if until_empty:
+                    break
+                await asyncio.sleep(poll_interval)
+                continue
+            results = await asyncio.gather(*(bounded(m) for m in batch))
+            await asyncio.to_thread(self._record, results)
+        return self.summary(time.monotonic() - started)
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        def pct(values: List[float], p: float) -> Optional[float]:
+            if not values:
+                return None
+            ordered = sorted(values)
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 4)
+
+        m = self.metrics
+        return {
+            "sent": m["sent"], "retried": m["retried"], "failed": m["failed"],
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(m["sent"] / elapsed, 2) if elapsed else None,
+            "send_latency_p50_s": pct(m["send_latency"], 0.5),
+            "send_latency_p95_s": pct(m["send_latency"], 0.95),
+            "delivery_latency_p50_s": pct(m["delivery_latency"], 0.5),
+            "delivery_latency_p95_s": pct(m["delivery_latency"], 0.95),
+        }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m services.notifications")
+    sub = parser.add_subparsers(dest="command", required=True)
+    enq = sub.add_parser("enqueue", help="queue upcoming and overdue rent reminders")
+    enq.add_argument("--as-of", default=date.today().isoformat(), help="YYYY-MM-DD")
+    enq.add_argument("--days-ahead", type=int, default=3)
+    dsp = sub.add_parser("dispatch", help="send queued messages")
+    dsp.add_argument("--concurrency", type=int, default=10)
+    dsp.add_argument("--rate", type=float, default=20.0, help="messages per second")
+    dsp.add_argument("--max-attempts", type=int, default=5)
+    dsp.add_argument("--smtp", default="localhost:1025", help="host:port")
+    dsp.add_argument("--sender", default="rentwise@localhost")
+    dsp.add_argument("--sms-url", default=None, help="SMS gateway URL")
+    args = parser.parse_args(argv)
+
+    from init_db import SessionLocal
+    if args.command == "enqueue":
+        as_of = datetime.strptime(args.as_of, "%Y-%m-%d").date()
+        session = SessionLocal()
+        try:
+            print(f"Queued {enqueue_reminders(session, as_of, args.days_ahead)} reminder(s).")
+        finally:
+            session.close()
+    elif args.command == "dispatch":
+        host, _, port = args.smtp.partition(":")
+        transports: Dict[str, Any] = {"email": SmtpTransport(host, int(port or 25), args.sender)}
+        if args.sms_url:
+            transports["sms"] = HttpSmsTransport(args.sms_url)
+        dispatcher = Dispatcher(SessionLocal.session_factory, transports, args.concurrency,
+                                args.rate, args.max_attempts)
+        print(json.dumps(asyncio.run(dispatcher.run()), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+# services/statements.py
+"""
+Month-end tenant statements.
+
+`gather` pulls everything for a period in four set-based queries (leases
+with their property and tenant, payments and charges before the period,
+and payments and charges inside it) and builds one plain-dict context per
+tenant. Rent charges are implied by `monthly_rent` on each due date (see
+services.late_fees.periods). `generate` renders each context to
+text/HTML/CSV with templates compiled once at import, fans the work out to
+worker processes, and skips any statement whose content hash matches the
+previous run's manifest.
+
+    python -m services.statements --from 2025-01-01 --to 2025-01-31 --out statements/ \
+        [--format text,html,csv] [--workers N]
+"""
+import argparse
+import csv
+import hashlib
+import html
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+from string import Template
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+
+from models.charge import Charge
+from models.lease import Lease
+from models.payment import Payment
+from models.property import Property
+from models.tenant import Tenant
+from services.late_fees import periods
+
+FORMATS = ("text", "html", "csv")
+MANIFEST = "manifest.json"
+TEMPLATE_VERSION = "1"  # bump when templates change so cached output is re-rendered
+_ZERO = Decimal("0")
+
+# ----- Templates (compiled once) -----
+
+_TEXT = Template("""\
+RentWise Pro - Tenant Statement
+Tenant:  $name (#$tenant_id)
+Contact: $contact
+Period:  $start to $end
+
+$leases
+Balance due: $closing
+""")
+_TEXT_LEASE = Template("""\
+Lease #$lease_id - $address (rent $rent/month)
+  Opening balance                              $opening
+$lines
+  Closing balance                              $closing
+""")
+_TEXT_LINE = Template("  $date  $description$pad$amount")
+
+_HTML = Template("""\
+<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Statement $start - $end: $name</title></head>
+<body>
+<h1>Tenant Statement</h1>
+<p>$name (#$tenant_id)<br>$contact<br>Period: $start to $end</p>
+$leases
+<p><strong>Balance due: $closing</strong></p>
+</body></html>
+""")
+_HTML_LEASE = Template("""\
+<h2>Lease #$lease_id &mdash; $address</h2>
+<table>
+<tr><th>Date</th><th>Description</th><th>Amount</th></tr>
+<tr><td></td><td>Opening balance</td><td>$opening</td></tr>
+$lines
+<tr><td></td><td><strong>Closing balance</strong></td><td><strong>$closing</strong></td></tr>
+</table>
+""")
+_HTML_LINE = Template("<tr><td>$date</td><td>$description</td><td>$amount</td></tr>")
+
+
+# ----- Data -----
+
+def _fmt(value: Decimal) -> str:
+    return f"{value:.2f}"
+
+
+def gather(session, start: date, end: date) -> Dict[int, Dict[str, Any]]:
+    """Return {tenant_id: statement context} for leases overlapping the period."""
+    leases = Lease.__table__
+    props = Property.__table__
+    tenants = Tenant.__table__
+    payments = Payment.__table__
+    charges = Charge.__table__
+
+    overlapping = (leases.c.start_date <= end) & (
+        leases.c.end_date.is_(None) | (leases.c.end_date >= start)
+    )
+    lease_ids = select(leases.c.id).where(overlapping).scalar_subquery()
+
+    rows = session.execute(
+        select(leases.c.id, leases.c.tenant_id, leases.c.start_date, leases.c.end_date,
+               props.c.address, props.c.monthly_rent, tenants.c.name, tenants.c.contact_info)
+        .join(props, props.c.id == leases.c.property_id)
+        .join(tenants, tenants.c.id == leases.c.tenant_id)
+        .where(overlapping)
+        .order_by(leases.c.tenant_id, leases.c.id)
+    ).all()
+
+    before: Dict[int, Decimal] = {}
+    for lid, paid in session.execute(
+        select(payments.c.lease_id, func.sum(payments.c.amount))
+        .where(payments.c.lease_id.in_(lease_ids), payments.c.date_paid < start)
+        .group_by(payments.c.lease_id)
+    ):
+        before[lid] = before.get(lid, _ZERO) - Decimal(paid)
+    for lid, charged in session.execute(
+        select(charges.c.lease_id, func.sum(charges.c.amount))
+        .where(charges.c.lease_id.in_(lease_ids), charges.c.period < start)
+        .group_by(charges.c.lease_id)
+    ):
+        before[lid] = before.get(lid, _ZERO) + Decimal(charged)
+
+    lines: Dict[int, List[Tuple[date, str, Decimal]]] = {}
+    for lid, when, amount, method in session.execute(
+        select(payments.c.lease_id, payments.c.date_paid, payments.c.amount, payments.c.method)
+        .where(payments.c.lease_id.in_(lease_ids), payments.c.date_paid.between(start, end))
+    ):
+        label = f"Payment ({method})" if method else "Payment"
+        lines.setdefault(lid, []).append((when, label, -Decimal(amount)))
+    for lid, period, amount, kind in session.execute(
+        select(charges.c.lease_id, charges.c.period, charges.c.amount, charges.c.kind)
+        .where(charges.c.lease_id.in_(lease_ids), charges.c.period.between(start, end))
+    ):
+        lines.setdefault(lid, []).append((period, kind.replace("_", " ").capitalize(), Decimal(amount)))
+
+    contexts: Dict[int, Dict[str, Any]] = {}
+    for lid, tid, lstart, lend, address, rent, name, contact in rows:
+        rent = Decimal(rent)
+        entries = list(lines.get(lid, []))
+        opening = before.get(lid, _ZERO)
+        for due in periods(lstart, lend, end):
+            if due < start:
+                opening += rent
+            else:
+                entries.append((due, "Rent", rent))
+        entries.sort(key=lambda e: (e[0], e[1]))
+        closing = opening + sum((e[2] for e in entries), _ZERO)
+
+        ctx = contexts.setdefault(tid, {
+            "tenant_id": tid, "name": name, "contact": contact,
+            "start": start.isoformat(), "end": end.isoformat(),
+            "leases": [], "closing": "0.00",
+        })
+        ctx["leases"].append({
+            "lease_id": lid, "address": address, "rent": _fmt(rent),
+            "opening": _fmt(opening), "closing": _fmt(closing),
+            "lines": [(d.isoformat(), desc, _fmt(a)) for d, desc, a in entries],
+        })
+        ctx["closing"] = _fmt(Decimal(ctx["closing"]) + closing)
+    return contexts
+
+
+# ----- Rendering -----
+
+def render(ctx: Dict[str, Any], fmt: str) -> str:
+    """Render one tenant's statement context as text, html or csv."""
+    if fmt == "text":
+        leases = "\n".join(
+            _TEXT_LEASE.substitute(
+                lease,
+                lines="\n".join(
+                    _TEXT_LINE.substitute(date=d, description=desc, amount=amt.rjust(12),
+                                          pad=" " * max(1, 31 - len(desc)))
+                    for d, desc, amt in lease["lines"]
+                ) or "  (no activity)",
+                opening=lease["opening"].rjust(12),
+                closing=lease["closing"].rjust(12),
+            )
+            for lease in ctx["leases"]
+        )
+        return _TEXT.substitute(ctx, leases=leases)
+    if fmt == "html":
+        esc = {k: html.escape(str(v)) for k, v in ctx.items() if k != "leases"}
+        leases = "\n".join(
+            _HTML_LEASE.substitute(
+                {k: html.escape(str(v)) for k, v in lease.items() if k != "lines"},
+                lines="\n".join(
+                    _HTML_LINE.substitute(date=d, description=html.escape(desc), amount=amt)
+                    for d, desc, amt in lease["lines"]
+                ),
+            )
+            for lease in ctx["leases"]
+        )
+        return _HTML.substitute(esc, leases=leases)
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(["tenant_id", "lease_id", "date", "description", "amount"])
+        for lease in ctx["leases"]:
+            writer.writerow([ctx["tenant_id"], lease["lease_id"], ctx["start"], "Opening balance", lease["opening"]])
+            for d, desc, amt in lease["lines"]:
+                writer.writerow([ctx["tenant_id"], lease["lease_id"], d, desc, amt])
+            writer.writerow([ctx["tenant_id"], lease["lease_id"], ctx["end"], "Closing balance", lease["closing"]])
+        return buf.getvalue()
+    raise ValueError(f"format must be one of {FORMATS}.")
+
+
+def _digest(ctx: Dict[str, Any], fmt: str) -> str:
+    payload = json.dumps([TEMPLATE_VERSION, fmt, ctx], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _filename(ctx: Dict[str, Any], fmt: str) -> str:
+    ext = {"text": "txt", "html": "html", "csv": "csv"}[fmt]
+    return f"tenant-{ctx['tenant_id']}_{ctx['start']}_{ctx['end']}.{ext}"
+
+
+def _render_batch(out_dir: str, jobs: Sequence[Tuple[Dict[str, Any], str]]) -> int:
+    """Worker: render and write a batch of (context, format) jobs."""
+    for ctx, fmt in jobs:
+        path = os.path.join(out_dir, _filename(ctx, fmt))
+        with open(path + ".tmp", "w", newline="") as f:
+            f.write(render(ctx, fmt))
+        os.replace(path + ".tmp", path)
+    return len(jobs)
+
+
+def generate(session, start: date, end: date, out_dir: str,
+             formats: Sequence[str] = ("text",), workers: Optional[int] = None,
+             batch_size: int = 500) -> Dict[str, int]:
+    """
+    Write every tenant's statement for the period into out_dir.
+
+    Returns counts of statements rendered and reused (unchanged content
+    hash with the file still present).
+    """
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of {FORMATS}.")
+    os.makedirs(out_dir, exist_ok=True)
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest: Dict[str, str] = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    jobs = []
+    reused = 0
+    new_manifest: Dict[str, str] = {}
+    for ctx in gather(session, start, end).values():
+        for fmt in formats:
+            name = _filename(ctx, fmt)
+            digest = _digest(ctx, fmt)
+            new_manifest[name] = digest
+            if manifest.get(name) == digest and os.path.exists(os.path.join(out_dir, name)):
+                reused += 1
+            else:
+                jobs.append((ctx, fmt))
+
+    batches = [jobs[i:i + batch_size] for i in range(0, len(jobs), batch_size)]
+    if workers == 1 or len(batches) <= 1:
+        rendered = sum(_render_batch(out_dir, b) for b in batches)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rendered = sum(pool.map(_render_batch, [out_dir] * len(batches), batches))
+
+    manifest.update(new_manifest)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return {"rendered": rendered, "reused": reused}
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m services.statements")
+    parser.add_argument("--from", dest="start", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="end", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--out", default="statements")
+    parser.add_argument("--format", default="text", help="comma-separated: text,html,csv")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    from init_db import SessionLocal
+    start = datetime.strptime(args.start, "%Y-%m-%d").date()
+    end = datetime.strptime(args.end, "%Y-%m-%d").date()
+    session = SessionLocal()
+    try:
+        counts = generate(session, start, end, args.out,
+                          [f.strip() for f in args.format.split(",") if f.strip()], args.workers)
+    finally:
+        session.close()
+    print(f"Statements {start} to {end}: {counts['rendered']} rendered, {counts['reused']} unchanged.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# services/timeseries.py
+"""
+Payment time series backed by precomputed daily/monthly rollups.
+
+`refresh` keeps `payment_rollups` current: the first run builds every
+bucket, later runs read the change stream (db.cdc) after the stored
+watermark and recompute only the leases whose payments, lease or property
+type changed. `series` answers range queries from the rollups alone and
+returns dense, zero-filled arrays ready for plotting or CSV export.
+"""
+import csv
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import Date, cast, func, literal, select
+
+from db.cdc import latest_seq, tail_changes
+from models.lease import Lease
+from models.payment import Payment
+from models.property import Property
+from models.rollup import PaymentRollup
+from models.watermark import Watermark
+
+GRAINS = ("day", "month")
+DIMENSIONS = ("lease_id", "property_id", "property_type", "method")
+WATERMARK = "payment_rollups"
+_CHUNK = 500
+
+
+def _bucket_expr(column, grain: str, dialect: str):
+    if dialect == "sqlite":
+        return func.date(column) if grain == "day" else func.strftime("%Y-%m-01", column)
+    return cast(func.date_trunc(grain, column), Date)
+
+
+def _chunks(ids: Sequence[int]) -> Iterable[Sequence[int]]:
+    for i in range(0, len(ids), _CHUNK):
+        yield ids[i:i + _CHUNK]
+
+
+def _rebuild(session, lease_ids: Optional[Sequence[int]] = None) -> None:
+    rollups = PaymentRollup.__table__
+    payments = Payment.__table__
+    leases = Lease.__table__
+    props = Property.__table__
+    dialect = session.get_bind().dialect.name
+    columns = ["grain", "bucket", "lease_id", "property_id", "property_type", "method", "total", "count"]
+
+    scopes = [None] if lease_ids is None else list(_chunks(list(lease_ids)))
+    for scope in scopes:
+        delete = rollups.delete()
+        if scope is not None:
+            delete = delete.where(rollups.c.lease_id.in_(scope))
+        session.execute(delete)
+        for grain in GRAINS:
+            bucket = _bucket_expr(payments.c.date_paid, grain, dialect)
+            group = (bucket, payments.c.lease_id, leases.c.property_id,
+                     props.c.property_type, payments.c.method)
+            src = (
+                select(literal(grain), *group, func.sum(payments.c.amount), func.count())
+                .select_from(
+                    payments.join(leases, leases.c.id == payments.c.lease_id)
+                    .join(props, props.c.id == leases.c.property_id)
+                )
+                .group_by(*group)
+            )
+            if scope is not None:
+                src = src.where(payments.c.lease_id.in_(scope))
+            session.execute(rollups.insert().from_select(columns, src))
+
+
+def _affected_leases(session, changes) -> Set[int]:
+    lease_ids: Set[int] = set()
+    payment_ids: Set[int] = set()
+    property_ids: Set[int] = set()
+    for change in changes:
+        diff = change.diff
+        if change.table_name == "payments":
+            lease_ids.update(v for v in diff.get("lease_id", []) if v is not None)
+            if change.op == "update":
+                payment_ids.add(change.row_id)
+        elif change.table_name == "leases" and "property_id" in diff:
+            lease_ids.add(change.row_id)
+        elif change.table_name == "properties" and "property_type" in diff:
+            property_ids.add(change.row_id)
+
+    payments = Payment.__table__
+    leases = Lease.__table__
+    for scope in _chunks(sorted(payment_ids)):
+        lease_ids.update(session.scalars(select(payments.c.lease_id).where(payments.c.id.in_(scope))))
+    for scope in _chunks(sorted(property_ids)):
+        lease_ids.update(session.scalars(select(leases.c.id).where(leases.c.property_id.in_(scope))))
+    return lease_ids
+
+
+def refresh(session, full: bool = False) -> int:
+    """
+    Bring the rollups up to date and commit.
+
+    Returns the number of leases recomputed, or -1 after a full rebuild.
+    """
+    target = latest_seq(session)
+    watermark = Watermark.get(session, WATERMARK)
+    if full or watermark == 0:
+        _rebuild(session)
+        recomputed = -1
+    else:
+        affected: Set[int] = set()
+        for batch in tail_changes(session, watermark):
+            batch = [c for c in batch if c.seq <= target]
+            affected |= _affected_leases(session, batch)
+            if not batch or batch[-1].seq >= target:
+                break
+        if affected:
+            _rebuild(session, sorted(affected))
+        recomputed = len(affected)
+    Watermark.set(session, WATERMARK, target)
+    session.commit()
+    return recomputed
+
+
+def buckets(start: date, end: date, grain: str = "month") -> List[date]:
+    """Every bucket start between start and end, inclusive."""
+    if grain == "day":
+        return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    out = []
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        out.append(date(year, month, 1))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return out
+
+
+def series(session, start: date, end: date, grain: str = "month",
+           by: Optional[str] = "property_id", keys: Optional[Iterable[Any]] = None,
+           method: Optional[str] = None, measure: str = "total") -> Tuple[List[date], Dict[Any, List[float]]]:
+    """
+    Return (buckets, {key: values}) for payments between start and end.
+
+    `by` is one of DIMENSIONS (or None for a single "all" series) and
+    `measure` is "total" or "count". Missing buckets are zero-filled, so
+    every value list lines up with the bucket list.
+    """
+    if grain not in GRAINS:
+        raise ValueError(f"grain must be one of {GRAINS}.")
+    if by is not None and by not in DIMENSIONS:
+        raise ValueError(f"by must be one of {DIMENSIONS} or None.")
+    if measure not in ("total", "count"):
+        raise ValueError("measure must be 'total' or 'count'.")
+
+    axis = buckets(start, end, grain)
+    if grain == "month":
+        start = date(start.year, start.month, 1)
+    index = {b: i for i, b in enumerate(axis)}
+    rollups = PaymentRollup.__table__
+    key_col = rollups.c[by] if by is not None else literal("all")
+
+    stmt = (
+        select(key_col, rollups.c.bucket, func.sum(rollups.c[measure]))
+        .where(rollups.c.grain == grain, rollups.c.bucket.between(start, end))
+        .group_by(key_col, rollups.c.bucket)
+    )
+    if method is not None:
+        stmt = stmt.where(rollups.c.method == method)
+    if keys is not None:
+        stmt = stmt.where(key_col.in_(list(keys)))
+
+    data: Dict[Any, List[float]] = {}
+    for key, bucket, value in session.execute(stmt):
+        values = data.setdefault(key, [0.0] * len(axis))
+        values[index[bucket]] = float(value)
+    return axis, data
+
+
+def write_csv(path: str, axis: List[date], data: Dict[Any, List[float]]) -> None:
+    """Write a series as CSV: one row per bucket, one column per key."""
+    keys = sorted(data, key=str)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["bucket", *keys])
+        for i, bucket in enumerate(axis):
+            writer.writerow([bucket.isoformat(), *(data[k][i] for k in keys)])
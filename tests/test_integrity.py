@@ -0,0 +1,53 @@
+# tests/test_integrity.py
+"""
+`--fix` repairs against a SQLite file: colliding trims are skipped, leases
+missing only their tenant are kept, and repairs reach the change stream.
+"""
+from datetime import date
+
+from sqlalchemy import create_engine, select
+
+from db.bulk import bulk_load
+from models import Base
+from models.change import ChangeRecord
+from models.lease import Lease
+from models.payment import Payment
+from models.property import Property
+from models.tenant import Tenant
+from services import integrity
+
+
+def test_fix_skips_collisions_and_records_changes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'rentwise.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        bulk_load(conn, Property, [{"address": " 1 Fix Street ", "monthly_rent": 1000}])
+        bulk_load(conn, Tenant, [
+            {"name": "Cat", "contact_info": "cat@example.com"},
+            {"name": "Kit", "contact_info": " cat@example.com"},
+        ])
+        bulk_load(conn, Lease, [
+            {"property_id": 1, "tenant_id": 99, "start_date": date(2025, 1, 1), "end_date": None},
+            {"property_id": 42, "tenant_id": 1, "start_date": date(2025, 1, 1), "end_date": None},
+        ])
+        bulk_load(conn, Payment, [
+            {"lease_id": lid, "amount": 100, "date_paid": date(2025, 1, 2), "method": None}
+            for lid in (1, 2)
+        ])
+
+    report = integrity.check(url, workers=1)
+    fixed = integrity.fix(url, report)
+    assert fixed == {"property_address_untrimmed": 1, "tenant_contact_untrimmed": 0,
+                     "lease_orphan_property": 1}
+
+    remaining = {i["check"]: i["row_ids"] for i in integrity.check(url, workers=1)["issues"]}
+    assert remaining == {"tenant_contact_untrimmed": [2], "lease_orphan_tenant": [1],
+                         "tenant_duplicate_contact": [2]}
+
+    with engine.connect() as conn:
+        changes = conn.execute(select(ChangeRecord.__table__.c["table_name", "row_id", "op"])
+                               .order_by("seq")).all()
+        assert list(conn.scalars(select(Payment.__table__.c.lease_id))) == [1]
+    assert changes == [("properties", 1, "update"), ("payments", 2, "delete"), ("leases", 2, "delete")]
+    engine.dispose()
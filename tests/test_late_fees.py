@@ -0,0 +1,109 @@
+# tests/test_late_fees.py
+"""
+Late-fee assessment for one lease, and the batch run against a SQLite file:
+charges are idempotent and incremental runs pick up payments and rent changes.
+"""
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+import db.cdc  # noqa: F401
+from db.bulk import bulk_load
+from models import Base
+from models.charge import Charge
+from models.lease import Lease
+from models.payment import Payment
+from models.property import Property
+from models.tenant import Tenant
+from services.late_fees import PenaltyRules, assess_lease, run
+
+START = date(2025, 1, 1)
+RENT = Decimal("1000")
+
+
+def test_fee_waits_for_the_grace_period():
+    rules = PenaltyRules(grace_days=5, flat_fee=Decimal("50"))
+    assert assess_lease(START, None, RENT, [], rules, date(2025, 1, 5)) == {}
+    assert assess_lease(START, None, RENT, [], rules, date(2025, 1, 6)) == {START: Decimal("50.00")}
+    paid_in_grace = [(date(2025, 1, 6), RENT)]
+    assert assess_lease(START, None, RENT, paid_in_grace, rules, date(2025, 1, 31)) == {}
+
+
+def test_fee_is_capped_and_charged_on_the_unpaid_part():
+    rules = PenaltyRules(grace_days=0, percent=Decimal("0.10"), cap=Decimal("60"))
+    assert assess_lease(START, None, RENT, [], rules, START) == {START: Decimal("60.00")}
+    partial = [(START, Decimal("600"))]
+    assert assess_lease(START, None, RENT, partial, rules, START) == {START: Decimal("40.00")}
+
+
+def test_compounding_charges_on_the_whole_balance():
+    as_of = date(2025, 2, 1)
+    simple = PenaltyRules(grace_days=0, percent=Decimal("0.10"))
+    compounding = PenaltyRules(grace_days=0, percent=Decimal("0.10"), compounding=True)
+    assert assess_lease(START, None, RENT, [], simple, as_of) == {
+        START: Decimal("100.00"), date(2025, 2, 1): Decimal("100.00"),
+    }
+    # February's base is two months' rent plus January's fee.
+    assert assess_lease(START, None, RENT, [], compounding, as_of) == {
+        START: Decimal("100.00"), date(2025, 2, 1): Decimal("210.00"),
+    }
+
+
+def test_ended_lease_stops_accruing():
+    rules = PenaltyRules(grace_days=0, flat_fee=Decimal("50"))
+    fees = assess_lease(START, date(2025, 2, 15), RENT, [], rules, date(2025, 6, 1))
+    assert sorted(fees) == [START, date(2025, 2, 1)]
+
+
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rentwise.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        bulk_load(conn, Property, [{"address": "1 Late Street", "monthly_rent": 1000}])
+        bulk_load(conn, Tenant, [{"name": "Tenant", "contact_info": "tenant@example.com"}])
+    with Session(engine) as session:
+        # Through the ORM, so the change stream is non-empty and runs after
+        # the first one are incremental.
+        session.add(Lease(property_id=1, tenant_id=1, lease_start=START))
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def _fees(session):
+    return dict(session.execute(select(Charge.period, Charge.amount).order_by(Charge.period)).all())
+
+
+def test_run_is_idempotent_and_incremental(session):
+    rules = PenaltyRules(grace_days=5, percent=Decimal("0.10"))
+    as_of = date(2025, 3, 10)
+
+    assert run(session, as_of, rules) == {"leases": 1, "inserted": 3, "updated": 0, "deleted": 0}
+    assert set(_fees(session).values()) == {Decimal("100.00")}
+
+    again = run(session, as_of, rules)
+    assert (again["inserted"], again["updated"], again["deleted"]) == (0, 0, 0)
+    assert len(_fees(session)) == 3
+
+    # A rent change on the property re-assesses its leases.
+    session.get(Property, 1).monthly_rent = 1200
+    session.commit()
+    assert run(session, as_of, rules) == {"leases": 1, "inserted": 0, "updated": 3, "deleted": 0}
+    assert set(_fees(session).values()) == {Decimal("120.00")}
+
+    # A payment within January's grace period clears January's fee.
+    session.add(Payment(lease_id=1, amount=Decimal("1200"), date_paid=date(2025, 1, 3)))
+    session.commit()
+    assert run(session, as_of, rules)["deleted"] == 1
+    assert sorted(_fees(session)) == [date(2025, 2, 1), date(2025, 3, 1)]
+
+
+def test_earlier_as_of_removes_fees_not_yet_assessable(session):
+    rules = PenaltyRules(grace_days=5, flat_fee=Decimal("25"))
+    run(session, date(2025, 3, 10), rules)
+    assert run(session, date(2025, 2, 10), rules)["deleted"] == 1
+    assert sorted(_fees(session)) == [START, date(2025, 2, 1)]
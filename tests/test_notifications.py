@@ -0,0 +1,96 @@
+# tests/test_notifications.py
+"""
+Reminder enqueue and dispatch against a SQLite file, delivering through
+MemoryTransport: dedup on re-enqueue, retries ending in `failed`, and two
+dispatchers draining one outbox without sending anything twice.
+"""
+import asyncio
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from db.bulk import bulk_load
+from models import Base, import_all
+from models.lease import Lease
+from models.outbox import OutboxMessage
+from models.property import Property
+from models.tenant import Tenant
+from services.notifications import Dispatcher, MemoryTransport, enqueue_reminders
+
+import_all()
+
+outbox = OutboxMessage.__table__
+
+
+@pytest.fixture
+def factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'rentwise.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        bulk_load(conn, Property, [{"address": "1 Remind Street", "monthly_rent": 1000}])
+        bulk_load(conn, Tenant, [{"name": "Tenant", "contact_info": "tenant@example.com"}])
+        bulk_load(conn, Lease, [{"property_id": 1, "tenant_id": 1, "start_date": date(2025, 1, 1),
+                                 "end_date": None}])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def _queue(factory, n):
+    now = datetime.now()
+    with factory() as session:
+        session.execute(insert(outbox), [
+            {"dedup_key": f"test:{i}", "tenant_id": 1, "channel": "email",
+             "recipient": "tenant@example.com", "subject": "Test", "body": f"Message {i}",
+             "status": "pending", "attempts": 0, "created_at": now, "next_attempt_at": now}
+            for i in range(n)
+        ])
+        session.commit()
+
+
+def _keys(factory):
+    with factory() as session:
+        return sorted(session.scalars(select(outbox.c.dedup_key)))
+
+
+def test_enqueue_is_deduplicated(factory):
+    with factory() as session:
+        assert enqueue_reminders(session, date(2025, 1, 10)) == 1
+        assert enqueue_reminders(session, date(2025, 1, 10)) == 0
+        # Still overdue since January (same key); February is now upcoming.
+        assert enqueue_reminders(session, date(2025, 1, 30)) == 1
+    assert _keys(factory) == ["overdue:1:2025-01-01", "upcoming:1:2025-02-01"]
+
+
+def test_failed_sends_retry_until_max_attempts(factory):
+    _queue(factory, 1)
+    transport = MemoryTransport(fail_every=1)
+    dispatcher = Dispatcher(factory, {"email": transport}, rate=1000, max_attempts=3, base_backoff=0)
+    summary = asyncio.run(dispatcher.run())
+
+    assert (summary["sent"], summary["retried"], summary["failed"]) == (0, 2, 1)
+    assert transport.calls == 3
+    with factory() as session:
+        status, attempts, error = session.execute(
+            select(outbox.c.status, outbox.c.attempts, outbox.c.last_error)
+        ).one()
+    assert (status, attempts, error) == ("failed", 3, "simulated delivery failure")
+
+
+def test_concurrent_dispatchers_do_not_double_send(factory):
+    _queue(factory, 60)
+    transports = [MemoryTransport(latency=0.005), MemoryTransport(latency=0.005)]
+    dispatchers = [Dispatcher(factory, {"email": t}, concurrency=4, rate=1000, batch_size=5)
+                   for t in transports]
+
+    async def both():
+        return await asyncio.gather(*(d.run() for d in dispatchers))
+
+    summaries = asyncio.run(both())
+    sent = [m["dedup_key"] for t in transports for m in t.sent]
+    assert sorted(sent) == _keys(factory) and len(set(sent)) == 60
+    assert sum(s["sent"] for s in summaries) == 60
+    assert all(t.sent for t in transports)  # both dispatchers claimed work
+    with factory() as session:
+        assert set(session.scalars(select(outbox.c.status))) == {"sent"}
@@ -0,0 +1,81 @@
+# tests/test_transactions.py
+"""
+commit_with_retry against a SQLite file: a writer that hits a lock is
+retried, but never over a change another session committed in between.
+"""
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+
+import db.transactions
+from db.transactions import commit_with_retry
+from models import Base, import_all
+from models.property import Property
+
+import_all()
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "rentwise.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Property(address="1 Retry Street", monthly_rent=1000))
+        session.commit()
+    engine.dispose()
+    return path
+
+
+def _locked_retry(monkeypatch, path, between=None):
+    """
+    Hold the write lock so the first commit fails, then release it (and
+    run `between`) during the backoff before the retry.
+    """
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+
+    def backoff(attempt, base_delay, max_delay):
+        if holder.in_transaction:
+            holder.execute("ROLLBACK")
+            if between is not None:
+                between()
+
+    monkeypatch.setattr(db.transactions, "_backoff", backoff)
+    return holder
+
+
+def test_lock_failure_is_retried(monkeypatch, path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 0})
+    holder = _locked_retry(monkeypatch, path)
+    with Session(engine) as session:
+        prop = session.scalars(select(Property)).one()
+        commit_with_retry(session, lambda s: setattr(prop, "monthly_rent", 1100))
+        assert prop.monthly_rent == 1100 and prop.version == 2
+    holder.close()
+    engine.dispose()
+
+
+def test_retry_does_not_overwrite_a_concurrent_change(monkeypatch, path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 0})
+
+    def other_writer():
+        with Session(engine) as other:
+            other.scalars(select(Property)).one().monthly_rent = 1200
+            other.commit()
+
+    holder = _locked_retry(monkeypatch, path, between=other_writer)
+    with Session(engine) as session:
+        prop = session.scalars(select(Property)).one()
+        assert prop.version == 1
+        with pytest.raises(StaleDataError):
+            commit_with_retry(session, lambda s: setattr(prop, "monthly_rent", 1100))
+
+    with Session(engine) as session:
+        prop = session.scalars(select(Property)).one()
+        assert (prop.monthly_rent, prop.version) == (1200, 2)
+    holder.close()
+    engine.dispose()
@@ -1,4 +1,8 @@
 # utils.py
+import traceback
+
+from db.transactions import conflict_message
+
 def input_str(prompt: str, allow_empty: bool = False) -> str:
     while True:
         val = input(prompt)
@@ -28,3 +32,12 @@ def input_int(prompt: str, min_val: int | None = None, max_val: int | None = Non
 
 def pause():
     input("\nPress Enter to continue...")
+
+def report_error(e: Exception, message: str | None = None) -> None:
+    """Print a conflict message for concurrency failures, else `message` and the traceback."""
+    conflict = conflict_message(e)
+    if conflict:
+        print(conflict)
+        return
+    print(message or f"❌ Error: {e}")
+    traceback.print_exc()